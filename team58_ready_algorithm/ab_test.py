@@ -0,0 +1,162 @@
+import argparse
+import math
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from engine import PLAYOUTS, RULES, Rules, SearchStats, parse_target
+from test_100_games import run_game
+
+DELTA = 0.05 # win rate improvement the test looks for
+ALPHA = 0.05 # chance of accepting an improvement that isn't there
+BETA = 0.05 # chance of missing an improvement of DELTA
+MAX_GAMES = 20000 # pairs played before giving up without a decision
+Z_95 = 1.959964 # two-sided 95% normal quantile
+ALGORITHMS = ("minimax", "alphabeta", "pvs", "solved", "mcts") # what play_game() plays
+CONFIG_KEYS = {"depth": int, "tt_size": int, "time_budget_ms": float, "playouts": int}
+
+
+#An engine configuration as run_game() plays it: "name" or "name:key=value,key=value", e.g.
+#"alphabeta:depth=7,tt_size=100000,ordering" or "alphabeta:ordering=killer+history".
+def parse_config(text):
+    name, _, options = text.partition(":")
+    if name not in ALGORITHMS:
+        raise ValueError(f"unknown engine {name!r}, one of {', '.join(ALGORITHMS)}")
+    config = {"algorithm": name, "tt_size": None, "time_budget_ms": None, "ordering": None, "depth": 5, "playouts": PLAYOUTS}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if key == "ordering":
+            config["ordering"] = True if value in ("", "1", "true") else tuple(value.split("+"))
+        elif key in CONFIG_KEYS:
+            config[key] = CONFIG_KEYS[key](value)
+        else:
+            raise ValueError(f"unknown option {key!r} in {text!r}")
+    return config
+
+
+def game_job(config, seed, rules=RULES):
+    return (config["algorithm"], seed, config["tt_size"], config["time_budget_ms"], config["ordering"], config["depth"],
+            False, config["playouts"], rules, None, False)
+
+
+#Wilson score interval of a win rate
+def wilson_interval(wins, games, z=Z_95):
+    if games == 0:
+        return 0.0, 1.0
+    rate = wins / games
+    center = (rate + z * z / (2 * games)) / (1 + z * z / games)
+    half = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return center - half, center + half
+
+
+#Log-likelihood ratio of "B wins delta more often than A" against "B is no better", from the
+#paired differences (B won and A lost, or the other way round) as a generalized SPRT with the
+#normal approximation. Like the virtual draws of tournament.elo_ratings(), one virtual pair each
+#way keeps the variance above zero, so two configurations that play the same games are told
+#apart from a real difference after a few dozen pairs instead of after the first.
+def sprt_llr(b_better, a_better, pairs, delta=DELTA):
+    if pairs == 0:
+        return 0.0
+    mean = (b_better - a_better) / pairs
+    n = pairs + 2
+    variance = (b_better + a_better + 2) / n - ((b_better - a_better) / n) ** 2
+    return pairs * delta * (mean - delta / 2) / variance
+
+
+def sprt_bounds(alpha=ALPHA, beta=BETA):
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+#Pairs of games, A and B from the same seed (same start number and random player's RNG),
+#played until the SPRT accepts one hypothesis or max_games pairs are played. The pairs are
+#checked in seed order, so the result only depends on seed, not on workers; a pool plays blocks
+#of pairs ahead and the games after the decision are dropped.
+#Returns ("B better" | "no improvement" | "inconclusive", summary dict).
+def ab_test(config_a, config_b, delta=DELTA, alpha=ALPHA, beta=BETA, max_games=MAX_GAMES, seed=0, workers=1, rules=RULES):
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    lower, upper = sprt_bounds(alpha, beta)
+    wins = [0, 0]
+    stats = [SearchStats(), SearchStats()]
+    b_better = a_better = pairs = 0
+    llr = 0.0
+    result = "inconclusive"
+
+    def blocks():
+        block = 64 * workers if workers > 1 else 1
+        for first in range(0, max_games, block):
+            jobs = []
+            for i in range(first, min(max_games, first + block)):
+                jobs += [game_job(config_a, seed + i, rules), game_job(config_b, seed + i, rules)]
+            yield jobs
+
+    start_time = time.perf_counter()
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        for jobs in blocks():
+            outcomes = pool.map(run_game, jobs) if pool is not None else list(map(run_game, jobs))
+            for i in range(0, len(outcomes), 2):
+                a_win, b_win = outcomes[i][0], outcomes[i + 1][0]
+                pairs += 1
+                wins[0] += a_win
+                wins[1] += b_win
+                stats[0].merge(outcomes[i][1])
+                stats[1].merge(outcomes[i + 1][1])
+                b_better += b_win and not a_win
+                a_better += a_win and not b_win
+                llr = sprt_llr(b_better, a_better, pairs, delta)
+                if llr >= upper or llr <= lower:
+                    result = "B better" if llr >= upper else "no improvement"
+                    break
+            if result != "inconclusive":
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+    elapsed = time.perf_counter() - start_time
+
+    mean = (b_better - a_better) / max(1, pairs)
+    variance = (b_better + a_better) / max(1, pairs) - mean * mean
+    half = Z_95 * math.sqrt(variance / max(1, pairs))
+    return result, {"pairs": pairs, "wins": wins, "b_better": b_better, "a_better": a_better, "llr": llr, "bounds": (lower, upper),
+                    "difference": (mean, mean - half, mean + half), "stats": stats, "time_s": elapsed}
+
+
+#The intervals are the plain fixed-sample ones; after a sequential stop they are a little too
+#optimistic about the side the test stopped on.
+def report(result, summary, labels=("A", "B"), delta=DELTA):
+    pairs = summary["pairs"]
+    print(f"SPRT for +{delta:.1%} win rate: {result} after {pairs} pairs ({2 * pairs} games) in {summary['time_s']:.1f} s, "
+          f"LLR {summary['llr']:.2f} in [{summary['bounds'][0]:.2f}, {summary['bounds'][1]:.2f}]")
+    for label, wins, stats in zip(labels, summary["wins"], summary["stats"]):
+        low, high = wilson_interval(wins, pairs)
+        print(f"{label}: AI wins {wins}/{pairs} = {wins / max(1, pairs):.1%} (95% CI {low:.1%} - {high:.1%}), "
+              f"{stats.nodes / max(1, stats.searches):.1f} nodes per AI turn")
+    mean, low, high = summary["difference"]
+    print(f"B - A: {mean:+.2%} win rate (95% CI {low:+.2%} - {high:+.2%}); "
+          f"B won {summary['b_better']} pairs A lost, A won {summary['a_better']} pairs B lost")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="A/B test of two engine configurations on paired seeds with a sequential probability ratio test")
+    parser.add_argument("a", help="baseline, name or name:key=value,... (depth, tt_size, ordering, time_budget_ms, playouts)")
+    parser.add_argument("b", help="candidate, same form")
+    parser.add_argument("--delta", type=float, default=DELTA, help="win rate improvement to detect (0.05 = 5 points)")
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="false positive rate")
+    parser.add_argument("--beta", type=float, default=BETA, help="false negative rate")
+    parser.add_argument("--max-games", type=int, default=MAX_GAMES, help="pairs played before stopping without a decision")
+    parser.add_argument("--seed", type=int, default=0, help="pair i is played with seed + i")
+    parser.add_argument("--workers", type=int, default=1, help="processes to play on, 0 uses every core")
+    parser.add_argument("--target", default=str(RULES.target), help="number to reach (5000, 1e9)")
+    args = parser.parse_args(argv)
+
+    rules = Rules(parse_target(args.target), RULES.multipliers, RULES.start_low, RULES.start_high)
+    result, summary = ab_test(parse_config(args.a), parse_config(args.b), args.delta, args.alpha, args.beta,
+                              args.max_games, args.seed, args.workers, rules)
+    report(result, summary, (args.a, args.b), args.delta)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import threading
+
+from engine import Deadline, SearchStats, SearchTimeout
+
+
+#Computes one AI move on a daemon thread so the pygame loop keeps drawing frames.
+#search(deadline, stats) returns the multiplier. It must check deadline (a Deadline) so the
+#move can be forced or cancelled, and stats (a SearchStats) is read by the UI for live node counts.
+class AIWorker:
+    def __init__(self, search, stats):
+        self.search = search
+        self.stats = stats
+        self.deadline = Deadline()
+        self.move = None # None after done means the search was stopped before it had a move
+        self.error = None
+        self.done = False
+        self.cancelled = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.move = self.search(self.deadline, self.stats)
+        except SearchTimeout:
+            self.move = None
+        except Exception as error: # handed to the UI thread by result()
+            self.error = error
+        finally:
+            self.done = True
+
+    #Stop searching and play the best move found so far
+    def force(self):
+        self.deadline.force()
+
+    #Stop searching and throw the result away (window closed, game abandoned)
+    def cancel(self):
+        self.cancelled = True
+        self.deadline.force()
+        self.thread.join()
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.move
+
+
+#Pondering: while the player is still choosing, searches the AI's reply to each possible
+#player move on one background thread. searches maps the player's multiplier to the
+#search(deadline, stats) of the position it leads to. Only one search runs at a time, so
+#a shared TT or MoveOrdering is never touched by two threads. The deadlines are only forced
+#by stop(), and a stopped iterative deepening search keeps its deepest completed iteration.
+class Ponderer:
+    def __init__(self, searches):
+        self.searches = searches
+        self.results = {} # player multiplier -> (AI move, SearchStats) of finished searches
+        self.deadline = Deadline()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        for multiplier, search in self.searches.items():
+            self.deadline = Deadline() # one per search, stop() forces the running one
+            if self.stopped:
+                return
+            stats = SearchStats()
+            try:
+                move = search(self.deadline, stats)
+            except SearchTimeout: # stopped before it had a move
+                return
+            if move is not None:
+                self.results[multiplier] = (move, stats)
+            if self.stopped:
+                return
+
+    def stop(self):
+        self.stopped = True
+        self.deadline.force()
+        self.thread.join()
+
+    #The player played multiplier: returns the finished (move, stats) for it or None,
+    #the other replies are thrown away.
+    def take(self, multiplier):
+        self.stop()
+        return self.results.get(multiplier)
@@ -0,0 +1,134 @@
+import argparse
+import heapq
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+from engine import move_value, solve_state
+from engine.game_record import RECORDS_PATH, GameRecord, iter_encoded, read_header
+
+BATCH_GAMES = 2000 # games sent to a worker at once
+TOP_BLUNDERS = 20 # worst moves listed in the report
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+#Re-scores every move of a batch of encoded games against perfect play (the solver, so the
+#stronger engine is exact). A move's loss is how much of the final margin it gave away; it is a
+#blunder when it turns a win into a draw or loss (or a draw into a loss) for the points the
+#mover already had, an inaccuracy when it loses margin without changing the result.
+#Returns ({engine: [moves, inaccuracies, blunders, total loss]}, worst blunders as sortable tuples).
+#Top-level so pool workers can run it; the solver memo stays warm in every worker.
+def analyze_batch(job):
+    rules, first_game, batch = job
+    engines = {}
+    worst = []
+    for game_index, data in enumerate(batch, start=first_game):
+        record = GameRecord.decode(data, rules)
+        for ply, (move, position) in enumerate(zip(record.moves, record.positions(rules))):
+            multiplier, engine = move[0], move[1]
+            number, bank, points = position
+            diff = points[ply % 2] - points[1 - ply % 2]
+            best_value, best_move = solve_state(number, bank, rules)
+            played_value = move_value(number, bank, multiplier, rules)
+            loss = best_value - played_value
+            row = engines.setdefault(engine, [0, 0, 0, 0])
+            row[0] += 1
+            row[3] += loss
+            if loss <= 0:
+                continue
+            blunder = sign(diff + played_value) < sign(diff + best_value)
+            row[2 if blunder else 1] += 1
+            if blunder:
+                entry = (loss, -game_index, -ply, engine, number, bank, multiplier, played_value, best_move, best_value)
+                if len(worst) < TOP_BLUNDERS:
+                    heapq.heappush(worst, entry)
+                else:
+                    heapq.heappushpop(worst, entry)
+    return engines, worst
+
+
+#Batches of (rules, index of the first game, encoded games), read as they are needed
+def batches(path, batch_games=BATCH_GAMES):
+    with open(path, "rb") as f:
+        rules = read_header(f)
+        batch = []
+        first_game = 0
+        for data in iter_encoded(f):
+            batch.append(data)
+            if len(batch) == batch_games:
+                yield rules, first_game, batch
+                first_game += len(batch)
+                batch = []
+        if batch:
+            yield rules, first_game, batch
+
+
+#Streams the file through the workers with at most two batches per worker in flight, so memory
+#stays constant however many games there are (Pool.imap would read the whole file ahead).
+def analyze(path=RECORDS_PATH, workers=0, batch_games=BATCH_GAMES):
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    engines = {}
+    worst = []
+    games = 0
+
+    def merge(result):
+        batch_engines, batch_worst = result
+        for engine, row in batch_engines.items():
+            total = engines.setdefault(engine, [0, 0, 0, 0])
+            for i, value in enumerate(row):
+                total[i] += value
+        worst[:] = heapq.nlargest(TOP_BLUNDERS, worst + batch_worst)
+
+    if workers > 1:
+        with Pool(workers) as pool:
+            in_flight = deque()
+            for job in batches(path, batch_games):
+                games += len(job[2])
+                in_flight.append(pool.apply_async(analyze_batch, (job,)))
+                if len(in_flight) >= 2 * workers:
+                    merge(in_flight.popleft().get())
+            while in_flight:
+                merge(in_flight.popleft().get())
+    else:
+        for job in batches(path, batch_games):
+            games += len(job[2])
+            merge(analyze_batch(job))
+    return games, engines, worst
+
+
+def report(games, engines, worst):
+    print(f"{'engine':12} {'moves':>10} {'avg loss':>9} {'inaccuracies':>13} {'blunders':>10}")
+    for engine in sorted(engines, key=lambda engine: engines[engine][3] / max(1, engines[engine][0])):
+        moves, inaccuracies, blunders, loss = engines[engine]
+        print(f"{engine:12} {moves:10} {loss / max(1, moves):9.4f} {inaccuracies / max(1, moves):13.2%} {blunders / max(1, moves):10.2%}")
+    if worst:
+        print()
+        print(f"Worst blunders of {games} games:")
+    for loss, game_index, ply, engine, number, bank, multiplier, played_value, best_move, best_value in sorted(worst, reverse=True):
+        print(f"game {-game_index} move {-ply + 1}: {engine} played x{multiplier} at {number} (bank {bank}), "
+              f"margin {played_value:+d}; x{best_move} gives {best_value:+d}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score recorded games against perfect play and report blunders")
+    parser.add_argument("path", nargs="?", default=RECORDS_PATH, help="game record file")
+    parser.add_argument("--workers", type=int, default=0, help="processes to analyze on, 0 uses every core")
+    parser.add_argument("--batch", type=int, default=BATCH_GAMES, help="games per worker task")
+    args = parser.parse_args(argv)
+
+    start_time = time.perf_counter()
+    games, engines, worst = analyze(args.path, args.workers, args.batch)
+    elapsed = time.perf_counter() - start_time
+    report(games, engines, worst)
+    print(f"Analyzed {games} games in {elapsed:.1f} s ({games / elapsed if elapsed else 0:,.0f} games/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
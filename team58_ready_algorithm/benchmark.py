@@ -0,0 +1,269 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from engine import (RULES, MoveOrdering, Node, Rules, SearchStats, StackSearch, TranspositionTable, alphabeta, evaluate,
+                    get_table, get_weights, minimax, parse_target, pvs, solved_move, stack_search, update_points_and_bank)
+from engine.position_cache import CACHE_PATH, open_cache
+
+DEFAULT_ENGINES = ["minimax", "alphabeta", "minimax_stack", "alphabeta_stack", "alphabeta_tt", "pvs", "pvs_tt", "solved"]
+DEPTHLESS_ENGINES = {"solved", "mcts"} # mcts runs its default playout budget
+MEMORY_GAMES = 5 # games replayed under tracemalloc for the peak memory figure
+REPEATS = 3 # times every case is played, its timings are the best of them
+LATENCY_FLOOR_MS = 0.005 # latency changes smaller than this are timer noise, never a regression
+
+
+#Returns move(current_number, ai_points, player_points, game_bank, depth) -> (multiplier, SearchStats)
+#with fresh per-game state (TT, history), so call it once per game. The *_cache engines share the
+#persistent PositionCache in cache_path instead, flushed after every move so other processes see it.
+def make_engine(name, rules=RULES, cache_path=CACHE_PATH):
+    core = stack_search if rules == RULES else StackSearch(evaluate, rules=rules)
+    if name == "minimax":
+        return lambda n, ai, pl, bank, depth: minimax(Node(n, ai, pl, bank, 0, True), depth, True, rules=rules)[1:]
+    if name == "alphabeta":
+        return lambda n, ai, pl, bank, depth: alphabeta(Node(n, ai, pl, bank, 0, True), depth, float('-inf'), float('inf'), True, rules=rules)[1:]
+    if name == "minimax_stack":
+        return lambda n, ai, pl, bank, depth: core.minimax(n, ai, pl, bank, depth)[1:]
+    if name == "alphabeta_stack":
+        return lambda n, ai, pl, bank, depth: core.alphabeta(n, ai, pl, bank, depth)[1:]
+    if name == "alphabeta_tt":
+        tt = TranspositionTable()
+        ordering = MoveOrdering(evaluate, update_points_and_bank, rules=rules)
+
+        def move(n, ai, pl, bank, depth):
+            ordering.new_search()
+            return alphabeta(Node(n, ai, pl, bank, 0, True), depth, float('-inf'), float('inf'), True, tt=tt, ordering=ordering, rules=rules)[1:]
+        return move
+    if name in ("pvs", "pvs_tt"):
+        tt = TranspositionTable() if name == "pvs_tt" else None
+        ordering = MoveOrdering(evaluate, update_points_and_bank, rules=rules) if name == "pvs_tt" else None
+        previous = [None] # score of the previous move, the aspiration guess of the next
+
+        def move(n, ai, pl, bank, depth):
+            if ordering is not None:
+                ordering.new_search()
+            previous[0], pv, stats = pvs(Node(n, ai, pl, bank, 0, True), depth, previous[0], tt=tt, ordering=ordering, rules=rules)
+            return pv[0], stats
+        return move
+    if name in ("minimax_cache", "alphabeta_cache"):
+        cache = open_cache(cache_path, rules, get_weights())
+        search = minimax if name == "minimax_cache" else alphabeta
+        window = () if name == "minimax_cache" else (float('-inf'), float('inf'))
+
+        def move(n, ai, pl, bank, depth):
+            result = search(Node(n, ai, pl, bank, 0, True), depth, *window, True, tt=cache, rules=rules)[1:]
+            cache.flush()
+            return result
+        return move
+    if name == "solved":
+        table = get_table(rules=rules)
+        return lambda n, ai, pl, bank, depth: (solved_move(table, n, bank, rules), SearchStats())
+    if name == "mcts":
+        from engine.mcts import MCTS # numpy is only loaded by the processes that play mcts
+        tree = MCTS(seed=0, rules=rules)
+        return lambda n, ai, pl, bank, depth: tree.search(n, ai, pl, bank)[1:]
+    raise ValueError(f"unknown engine: {name}")
+
+
+#One game against the seeded random player, same rules and RNG use as play_game().
+#Returns (ai_won, [per-move latency in ns], total visited nodes).
+def play_benchmark_game(engine, depth, seed, rules=RULES, cache_path=CACHE_PATH):
+    rng = random.Random(seed)
+    move = make_engine(engine, rules, cache_path)
+    current_number = rules.random_start(rng)
+    ai_points = player_points = game_bank = 0
+    is_player_turn = True
+    latencies = []
+    nodes = 0
+    while current_number < rules.target:
+        if is_player_turn:
+            multiplier = rules.random_move(rng)
+        else:
+            start_time = time.perf_counter_ns()
+            multiplier, stats = move(current_number, ai_points, player_points, game_bank, depth)
+            latencies.append(time.perf_counter_ns() - start_time)
+            nodes += stats.nodes
+        current_number, ai_points, player_points, game_bank, ai_to_move = rules.apply(
+            (current_number, ai_points, player_points, game_bank, not is_player_turn), multiplier)
+        is_player_turn = not ai_to_move
+    return ai_points > player_points, latencies, nodes
+
+
+#Nearest-rank percentile of an already sorted list
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+#One pass over the games of a case.
+#Returns (ai_wins, [per-move latency in ns] in the order played, total visited nodes).
+def play_case(engine, depth, games, seed, rules=RULES, cache_path=CACHE_PATH):
+    ai_wins = 0
+    latencies = []
+    nodes = 0
+    for i in range(games):
+        ai_won, game_latencies, game_nodes = play_benchmark_game(engine, depth, seed + i, rules, cache_path)
+        ai_wins += ai_won
+        latencies.extend(game_latencies)
+        nodes += game_nodes
+    return ai_wins, latencies, nodes
+
+
+#Result of a case from its play_case() passes: every move's latency is the best of the passes.
+#The games, wins and nodes are the same in each, so what differs is only noise from the rest of
+#the machine. The *_cache engines may play other moves once warm, then the fastest pass is kept.
+def case_result(engine, depth, games, seed, passes, rules=RULES, cache_path=CACHE_PATH):
+    peak = 0
+    for i in range(min(games, MEMORY_GAMES)):
+        tracemalloc.start()
+        play_benchmark_game(engine, depth, seed + i, rules, cache_path)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    ai_wins, latencies, nodes = passes[0]
+    if all(len(run) == len(latencies) for _, run, _ in passes):
+        latencies = [min(move_latencies) for move_latencies in zip(*(run for _, run, _ in passes))]
+    else:
+        ai_wins, latencies, nodes = min(passes, key=lambda case_pass: sum(case_pass[1]))
+    latencies = sorted(latencies)
+    search_seconds = sum(latencies) / 1e9
+    return {
+        "engine": engine,
+        "depth": depth,
+        "target": rules.target,
+        "games": games,
+        "repeats": len(passes),
+        "ai_wins": ai_wins,
+        "moves": len(latencies),
+        "nodes": nodes,
+        "nodes_per_sec": nodes / search_seconds if search_seconds else 0.0,
+        "latency_ms": {
+            "mean": search_seconds * 1000 / len(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 50) / 1e6,
+            "p95": percentile(latencies, 95) / 1e6,
+            "p99": percentile(latencies, 99) / 1e6,
+        },
+        "peak_memory_kib": peak / 1024,
+    }
+
+
+def run_case(engine, depth, games, seed, rules=RULES, cache_path=CACHE_PATH, repeats=REPEATS):
+    passes = [play_case(engine, depth, games, seed, rules, cache_path) for _ in range(repeats)]
+    return case_result(engine, depth, games, seed, passes, rules, cache_path)
+
+
+#With several targets this is the latency-vs-target benchmark: every engine and depth is
+#run once per target (same multipliers and start numbers).
+#Every repeat plays all the cases, so a slow spell of the machine hits one pass of many cases
+#instead of every pass of one. The *_cache engines warm-start from cache_path, so their passes
+#after the first are warm.
+def run_benchmark(engines, depths, games, seed, targets=(RULES.target,), multipliers=RULES.multipliers, cache_path=CACHE_PATH, repeats=REPEATS):
+    cases = [(Rules(target, multipliers), engine, depth) for target in targets for engine in engines
+             for depth in ([None] if engine in DEPTHLESS_ENGINES else depths)]
+    passes = [[] for _ in cases]
+    results = []
+    for repeat in range(repeats):
+        for (rules, engine, depth), case_passes in zip(cases, passes):
+            case_passes.append(play_case(engine, depth, games, seed, rules, cache_path))
+            if repeat == repeats - 1:
+                results.append(report_case(case_result(engine, depth, games, seed, case_passes, rules, cache_path)))
+    return {
+        "meta": {
+            "games": games,
+            "repeats": repeats,
+            "seed": seed,
+            "multipliers": list(multipliers),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def report_case(result):
+    latency = result["latency_ms"]
+    moves_per_game = result["moves"] / result["games"]
+    print(f"{result['engine']:16} depth {str(result['depth']):4} target {result['target']:<14g} wins {result['ai_wins']:5}/{result['games']} "
+          f"moves/game {moves_per_game:5.1f} nodes {result['nodes']:9} {result['nodes_per_sec']:12,.0f} nodes/s "
+          f"p50 {latency['p50']:.4f} p95 {latency['p95']:.4f} p99 {latency['p99']:.4f} ms "
+          f"peak {result['peak_memory_kib']:.1f} KiB")
+    return result
+
+
+#Flags timing/memory that got worse than threshold (relative, and for latencies also by more
+#than LATENCY_FLOOR_MS) and any change in the deterministic counters (wins, nodes), which means
+#the engine now plays differently. Timings are best-of-repeats, so compare runs with repeats > 1.
+def compare(current, baseline, threshold):
+    regressions = []
+    old_results = {(r["engine"], r["depth"], r.get("target", RULES.target)): r for r in baseline["results"]}
+    same_games = (current["meta"]["games"], current["meta"]["seed"], current["meta"]["multipliers"]) == \
+        (baseline["meta"]["games"], baseline["meta"]["seed"], baseline["meta"].get("multipliers", list(RULES.multipliers)))
+    for new in current["results"]:
+        old = old_results.get((new["engine"], new["depth"], new["target"]))
+        if old is None:
+            continue
+        name = f"{new['engine']} depth {new['depth']} target {new['target']}"
+        for key in ("p50", "p95", "p99"):
+            if old["latency_ms"][key] and new["latency_ms"][key] > old["latency_ms"][key] * (1 + threshold) + LATENCY_FLOOR_MS:
+                regressions.append(f"{name}: {key} latency {old['latency_ms'][key]:.4f} -> {new['latency_ms'][key]:.4f} ms")
+        if old["nodes_per_sec"] and new["nodes_per_sec"] < old["nodes_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: nodes/s {old['nodes_per_sec']:,.0f} -> {new['nodes_per_sec']:,.0f}")
+        if old["peak_memory_kib"] and new["peak_memory_kib"] > old["peak_memory_kib"] * (1 + threshold):
+            regressions.append(f"{name}: peak memory {old['peak_memory_kib']:.1f} -> {new['peak_memory_kib']:.1f} KiB")
+        if same_games:
+            for key in ("ai_wins", "nodes"):
+                if new[key] != old[key]:
+                    regressions.append(f"{name}: {key} changed {old[key]} -> {new[key]}")
+    return regressions
+
+
+def parse_depths(text):
+    if "-" in text:
+        low, high = text.split("-")
+        return list(range(int(low), int(high) + 1))
+    return [int(depth) for depth in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproducible benchmark of the search engines")
+    parser.add_argument("--engines", default=",".join(DEFAULT_ENGINES), help="comma separated engine names")
+    parser.add_argument("--depths", default="1-10", help="depth range (1-10) or list (2,5,8)")
+    parser.add_argument("--games", type=int, default=200, help="games per engine and depth")
+    parser.add_argument("--seed", type=int, default=0, help="game i is played with seed + i")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="times every case is played, timings are the best run")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to check for regressions against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown before flagging")
+    parser.add_argument("--targets", default=str(RULES.target), help="comma separated targets (5000,1e6,1e9) for latency vs target size")
+    parser.add_argument("--multipliers", default=",".join(map(str, RULES.multipliers)), help="comma separated multipliers")
+    parser.add_argument("--position-cache", default=CACHE_PATH, help="file of the minimax_cache and alphabeta_cache engines")
+    args = parser.parse_args(argv)
+
+    targets = [parse_target(target) for target in args.targets.split(",")]
+    multipliers = tuple(int(multiplier) for multiplier in args.multipliers.split(","))
+    current = run_benchmark(args.engines.split(","), parse_depths(args.depths), args.games, args.seed, targets, multipliers, args.position_cache, args.repeats)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+#The game engine: rules, evaluation and every search, without pygame, graphviz or anything that
+#runs at import; weights.json is read on the first evaluation. numpy is only loaded by engine.batched_search and engine.mcts, import them when needed.
+from .core import ASPIRATION_WINDOW, PLAYOUTS, Node, alphabeta, configure, evaluate, get_weights, minimax, negamax, pvs, stack_search
+from .iterative_deepening import Deadline, SearchTimeout, iterative_deepening
+from .move_ordering import MoveOrdering
+from .rules import RULES, Rules, parse_target, update_points_and_bank
+from .search_stats import SearchStats
+from .solver import get_table, move_value, solve, solve_state, solved_move
+from .stack_search import StackSearch
+from .transposition import EXACT, TranspositionTable
+from .weights import WEIGHTS_FILE, load_weights, save_weights
@@ -0,0 +1,176 @@
+import random
+import time
+
+import numpy as np
+
+from .core import get_weights
+from .rules import RULES
+from .search_stats import SearchStats
+
+MAX_LEAVES = 1 << 21 # worst-case leaves expanded at once, bounds the memory of one chunk
+
+
+#Vector form of update_points_and_bank(): a number ends in 0 or 5 exactly when it is divisible by 5
+def update_points_and_bank_batch(numbers):
+    points = np.where(numbers % 2 == 0, -1, 1)
+    bank = (numbers % 5 == 0).astype(np.int64)
+    return points, bank
+
+
+#Vector form of Rules.apply() for the games in active, in place: mover_points are the points of
+#the side to move in every game, and whoever reaches the target takes the bank.
+def apply_batch(numbers, mover_points, banks, active, multipliers, rules=RULES):
+    new_numbers = numbers[active] * multipliers
+    points, bank_gain = update_points_and_bank_batch(new_numbers)
+    mover_points[active] += points
+    banks[active] += bank_gain
+    numbers[active] = new_numbers
+    finished = active[new_numbers >= rules.target]
+    mover_points[finished] += banks[finished]
+
+
+#Vector form of evaluate() on the AI points minus player points difference.
+#Tree nodes are always built with is_ai_turn=True, so a reached target scores +inf.
+def evaluate_batch(numbers, diffs, banks, weights=None, rules=RULES):
+    A, B, C = weights if weights is not None else get_weights()
+    scores = A * diffs + B * banks - C * np.abs(rules.target - numbers)
+    return np.where(numbers >= rules.target, np.inf, scores)
+
+
+#Expands the chunk ply by ply as one flat frontier. Only nodes below the target are
+#expanded, and their children are stored next to each other, so reducing max/min
+#back up is a reshape to (expanded nodes, moves). Returns the root values and, for every
+#root below the target, the values of its children.
+def _minimax_chunk(numbers, diffs, banks, depth, weights, stats, rules):
+    multipliers = np.array(rules.multipliers, dtype=np.int64)
+    moves = len(multipliers)
+    levels = []
+    number, diff, bank = numbers, diffs, banks
+    for ply in range(depth):
+        expand = number < rules.target
+        levels.append((number, diff, bank, expand))
+        stats.nodes += len(number)
+        if stats.detailed:
+            stats.leaf_evaluations += len(number) - int(np.count_nonzero(expand))
+            while len(stats.nodes_per_ply) <= ply:
+                stats.nodes_per_ply.append(0)
+            stats.nodes_per_ply[ply] += len(number)
+        child_numbers = (number[expand][:, None] * multipliers).ravel()
+        points, bank_gain = update_points_and_bank_batch(child_numbers)
+        sign = 1 if ply % 2 == 0 else -1 # the AI (maximizing) moves on even plies
+        diff = np.repeat(diff[expand], moves) + sign * points
+        bank = np.repeat(bank[expand], moves) + bank_gain
+        number = child_numbers
+
+    values = evaluate_batch(number, diff, bank, weights, rules)
+    stats.nodes += len(number)
+    if stats.detailed:
+        stats.leaf_evaluations += len(number)
+        while len(stats.nodes_per_ply) <= depth:
+            stats.nodes_per_ply.append(0)
+        stats.nodes_per_ply[depth] += len(number)
+    root_children = None
+    for ply in range(depth - 1, -1, -1):
+        number, diff, bank, expand = levels[ply]
+        grouped = values.reshape(-1, moves)
+        if ply == 0:
+            root_children = grouped
+        values = np.empty(len(number))
+        values[~expand] = evaluate_batch(number[~expand], diff[~expand], bank[~expand], weights, rules)
+        values[expand] = grouped.max(axis=1) if ply % 2 == 0 else grouped.min(axis=1)
+    return values, root_children
+
+
+#minimax() for a whole batch of AI-to-move positions at once.
+#Returns (scores, multipliers, stats); the multiplier is 0 for positions that already reached the target.
+#Ties go to the first multiplier, like the strict comparison in minimax(). stats (SearchStats)
+#counts the nodes of the whole batch.
+def batched_minimax(numbers, ai_points, player_points, banks, depth=5, weights=None, max_leaves=MAX_LEAVES, stats=None, rules=RULES):
+    if weights is None:
+        weights = get_weights()
+    if stats is None:
+        stats = SearchStats()
+    stats.depth = depth
+    numbers = np.asarray(numbers, dtype=np.int64)
+    diffs = np.asarray(ai_points, dtype=np.int64) - np.asarray(player_points, dtype=np.int64)
+    banks = np.asarray(banks, dtype=np.int64)
+    scores = np.empty(len(numbers))
+    moves = np.zeros(len(numbers), dtype=np.int64)
+    if depth == 0:
+        scores[:] = evaluate_batch(numbers, diffs, banks, weights, rules)
+        stats.nodes += len(numbers)
+        return scores, moves, stats
+    multipliers = np.array(rules.multipliers, dtype=np.int64)
+    chunk = max(1, max_leaves // len(multipliers) ** depth)
+    for start in range(0, len(numbers), chunk):
+        end = start + chunk
+        chunk_scores, root_children = _minimax_chunk(numbers[start:end], diffs[start:end], banks[start:end], depth, weights, stats, rules)
+        scores[start:end] = chunk_scores
+        moves[start:end][numbers[start:end] < rules.target] = multipliers[np.argmax(root_children, axis=1)]
+    return scores, moves, stats
+
+
+#play_game("minimax") for many games in lockstep: one batched search per AI ply for every
+#game still running. Game i uses seed + i exactly like play_game(), so the outcomes match
+#test_algorithm("minimax", seed=seed). Returns (ai_wins, search time in ms).
+def play_games_batched(games, depth=5, seed=0, weights=None, rules=RULES):
+    rngs = [random.Random(seed + i) for i in range(games)]
+    numbers = np.array([rules.random_start(rng) for rng in rngs], dtype=np.int64)
+    ai_points = np.zeros(games, dtype=np.int64)
+    player_points = np.zeros(games, dtype=np.int64)
+    banks = np.zeros(games, dtype=np.int64)
+    search_time_ms = 0.0
+    is_player_turn = True
+    while True:
+        active = np.flatnonzero(numbers < rules.target)
+        if len(active) == 0:
+            break
+        if is_player_turn:
+            multipliers = np.array([rules.random_move(rngs[i]) for i in active], dtype=np.int64)
+        else:
+            start_time = time.perf_counter()
+            _, multipliers, _ = batched_minimax(numbers[active], ai_points[active], player_points[active], banks[active], depth, weights, rules=rules)
+            search_time_ms += (time.perf_counter() - start_time) * 1000
+        apply_batch(numbers, player_points if is_player_turn else ai_points, banks, active, multipliers, rules)
+        is_player_turn = not is_player_turn
+    return int(np.sum(ai_points > player_points)), search_time_ms
+
+
+#Self-play for weight tuning: weights against opponent_weights (None plays random moves) in
+#pairs of games from the same start and the same opening_plies random moves, weights moving
+#first in one game of the pair and second in the other. Pair i uses seed + i, so every set of
+#weights meets the same openings. Returns the score of weights in every pair, the mean of its
+#two games (win 1, draw 0.5, loss 0).
+def play_weights_batched(pairs, weights, opponent_weights=None, depth=5, seed=0, opening_plies=2, rules=RULES):
+    rngs = [random.Random(seed + i) for i in range(pairs)]
+    games = 2 * pairs
+    numbers = np.repeat(np.array([rules.random_start(rng) for rng in rngs], dtype=np.int64), 2)
+    points = np.zeros((2, games), dtype=np.int64) # points[0] of the side that moves first
+    banks = np.zeros(games, dtype=np.int64)
+    tuned_side = np.tile([0, 1], pairs) # side weights plays in every game
+    ply = 0
+    while True:
+        active = np.flatnonzero(numbers < rules.target)
+        if len(active) == 0:
+            break
+        side = ply % 2
+        multipliers = np.empty(len(active), dtype=np.int64)
+        if ply < opening_plies: # both games of a pair are still in the same position
+            opening = np.array([rules.random_move(rng) for rng in rngs], dtype=np.int64)
+            multipliers[:] = opening[active // 2]
+        else:
+            tuned = tuned_side[active] == side
+            for mask, side_weights in ((tuned, weights), (~tuned, opponent_weights)):
+                movers = active[mask]
+                if len(movers) == 0:
+                    continue
+                if side_weights is None:
+                    multipliers[mask] = [rules.random_move(rngs[game // 2]) for game in movers]
+                else:
+                    _, multipliers[mask], _ = batched_minimax(numbers[movers], points[side, movers], points[1 - side, movers], banks[movers], depth, side_weights, rules=rules)
+        apply_batch(numbers, points[side], banks, active, multipliers, rules)
+        ply += 1
+    own = np.where(tuned_side == 0, points[0], points[1])
+    other = np.where(tuned_side == 0, points[1], points[0])
+    scores = np.where(own > other, 1.0, np.where(own == other, 0.5, 0.0))
+    return scores.reshape(pairs, 2).mean(axis=1)
@@ -0,0 +1,182 @@
+import math
+
+from .iterative_deepening import SearchTimeout
+from .rules import RULES, update_points_and_bank
+from .search_stats import SearchStats
+from .stack_search import StackSearch
+from .transposition import EXACT
+from .weights import load_weights
+
+_weights = None # A, B, C of evaluate(), read from weights.json on first use or set by configure()
+ASPIRATION_WINDOW = 1.0 # half width of pvs()'s first window, in points
+PLAYOUTS = 64 # default playout budget per move of engine.mcts, here so callers needn't load numpy for it
+
+#One game state of the search tree
+class Node:
+    __slots__ = ("current_number", "ai_points", "player_points", "game_bank", "depth", "is_maximizing", "multiplier", "children", "is_ai_turn")
+    def __init__(self, current_number, ai_points, player_points, game_bank, depth, is_maximizing, multiplier=None,is_ai_turn=True):
+        self.current_number = current_number #The current number in the game state
+        self.ai_points = ai_points #The AI's points.
+        self.player_points = player_points #The player's points. 
+        self.game_bank = game_bank # Bank points
+        self.depth = depth #depth of this node in the game tree
+        self.is_maximizing = is_maximizing #goal at this node is to maximize points (AI's turn) or minimize (player's turn).
+        self.multiplier = multiplier #multiplier, used to modify calculations in the game logic.
+        self.children = [] # children list
+        self.is_ai_turn = is_ai_turn # Indicates if it's currently the AI's turn at this game state.
+    def add_child(self, child):
+        self.children.append(child) #add a child Node to the children list, forming parent-child relationships in the tree structure.
+
+#Sets the weights of evaluate(), or reads them again from weights.json (tuned by tune_weights.py)
+#when weights is None. Returns the weights now in use.
+def configure(weights=None):
+    global _weights
+    _weights = load_weights() if weights is None else tuple(weights)
+    return _weights
+
+#The weights of evaluate(); weights.json is only read the first time they are needed
+def get_weights():
+    return _weights if _weights is not None else configure()
+
+#Evaluates the current state of the game for AI.
+def evaluate(current_number, ai_points, player_points, game_bank,  is_ai_turn, rules=RULES):
+    A, B, C = _weights if _weights is not None else get_weights()
+    base_score = A * (ai_points - player_points) + B * game_bank - C * abs(rules.target - current_number)
+
+    if current_number >= rules.target:
+        return float('inf') if is_ai_turn else float('-inf')
+    else:
+        return base_score
+
+stack_search = StackSearch(evaluate) # Node-free, non-recursive core used by play_game() when no TT/ordering is on
+
+#Negamax core of minimax(), alphabeta() and pvs(). color is 1 when the AI moves and -1 when the
+#player does, and scores are from the point of view of the side to move, so one loop serves both
+#sides. prune=False searches every move (minimax). null_window is principal variation search:
+#every move after the first is only searched with the window just above alpha, which proves it is
+#no better than the best so far, and is searched again with the full window when it is better.
+#TT entries keep the AI's point of view, so a PositionCache file means the same to every search.
+#Returns (score, best move) or, with want_pv, (score, principal variation as a tuple of multipliers)
+#that ends at a TT hit; only pvs() wants the variation, building it at every node costs ~8% nodes/s.
+#trace is told about every node: trace.visit(node) on entry, trace.cutoff(node, skipped moves) and
+#trace.leave(node, score from the AI's side, "leaf" | "tt" | "searched") (treegenerator.py draws it).
+def negamax(node, depth, alpha, beta, color, stats, tt=None, first_move=None, deadline=None, ordering=None, rules=RULES, prune=True, null_window=False,
+            want_pv=False, trace=None):
+    stats.nodes += 1
+    if trace is not None:
+        trace.visit(node)
+    if stats.detailed:
+        stats.record_node(node.depth)
+    if deadline is not None and stats.nodes % 64 == 0 and deadline.expired():
+        raise SearchTimeout()
+    if node.current_number >= rules.target or depth == 0:
+        if stats.detailed:
+            stats.leaf_evaluations += 1
+        score = evaluate(node.current_number, node.ai_points, node.player_points, node.game_bank, node.is_ai_turn, rules)
+        if trace is not None:
+            trace.leave(node, score, "leaf")
+        return color * score, () if want_pv else None
+    is_maximizing = color == 1
+    hash_move = first_move
+    if tt is not None:
+        key = tt.make_key(node, is_maximizing)
+        alpha_orig, beta_orig = (alpha, beta) if is_maximizing else (-beta, -alpha) # the window from the AI's side
+        score, move = tt.probe(key, depth, alpha_orig, beta_orig) if prune else tt.probe(key, depth)
+        if score is not None:
+            if trace is not None:
+                trace.leave(node, score, "tt")
+            if want_pv:
+                return color * score, (move,) if move is not None else ()
+            return color * score, move
+        if hash_move is None:
+            hash_move = move
+    if ordering is not None:
+        moves = ordering.order_moves(node, is_maximizing, hash_move)
+    else:
+        moves = rules.multipliers if first_move is None else [first_move] + [m for m in rules.multipliers if m != first_move]
+    best_score, best = float('-inf'), () if want_pv else None
+    for index, multiplier in enumerate(moves):
+        new_number = node.current_number * multiplier
+        points, bank = update_points_and_bank(new_number)
+        if is_maximizing:
+            child = Node(new_number, node.ai_points + points, node.player_points, node.game_bank + bank, node.depth + 1, False, multiplier)
+        else:
+            child = Node(new_number, node.ai_points, node.player_points + points, node.game_bank + bank, node.depth + 1, True, multiplier)
+        if null_window and index > 0:
+            # (alpha, next float above alpha): scores are floats, so this is the narrowest window that
+            # still tells "no better than alpha" from "better", and a tie keeps the earlier move as minimax does
+            score, child_best = negamax(child, depth - 1, -math.nextafter(alpha, math.inf), -alpha, -color, stats, tt, None, deadline, ordering, rules, prune, null_window, want_pv, trace)
+            score = -score
+            if alpha < score < beta:
+                score, child_best = negamax(child, depth - 1, -beta, -alpha, -color, stats, tt, None, deadline, ordering, rules, prune, null_window, want_pv, trace)
+                score = -score
+        else:
+            score, child_best = negamax(child, depth - 1, -beta, -alpha, -color, stats, tt, None, deadline, ordering, rules, prune, null_window, want_pv, trace)
+            score = -score
+        if score > best_score or index == 0: # the first move stays in the variation when every move loses
+            best_score, best = score, (multiplier,) + child_best if want_pv else multiplier
+        if prune:
+            alpha = max(alpha, score)
+            if beta <= alpha:
+                if ordering is not None:
+                    ordering.record_cutoff(node, multiplier, index, depth, is_maximizing)
+                if stats.detailed:
+                    stats.record_cutoff(node.depth)
+                if trace is not None:
+                    trace.cutoff(node, moves[index + 1:])
+                break
+    if tt is not None:
+        best_move = best_move_of(best_score, (best[0] if best else None) if want_pv else best)
+        if prune:
+            tt.store_bound(key, depth, color * best_score, best_move, alpha_orig, beta_orig)
+        else:
+            tt.store(key, depth, EXACT, color * best_score, best_move)
+    if trace is not None:
+        trace.leave(node, color * best_score, "searched")
+    return best_score, best
+
+#The move minimax() and alphabeta() report: None at a leaf or when every move loses outright
+def best_move_of(score, move):
+    return move if score > float('-inf') else None
+
+# minimax algorithm
+#stats (SearchStats) collects the counters of this search, a new one is made when not given,
+#deadline (a Deadline) aborts the search with SearchTimeout, rules (Rules) is the game being played
+def minimax(node, depth, is_maximizing, stats=None, tt=None, deadline=None, rules=RULES):
+    if stats is None:
+        stats = SearchStats()
+    color = 1 if is_maximizing else -1
+    score, move = negamax(node, depth, float('-inf'), float('inf'), color, stats, tt, deadline=deadline, rules=rules, prune=False)
+    return color * score, best_move_of(score, move), stats
+
+# alphabeta algorithm
+#first_move is searched first at this node, deadline (a Deadline) aborts the search with SearchTimeout,
+#ordering (MoveOrdering) replaces the fixed multiplier order, stats and rules as in minimax()
+def alphabeta(node, depth, alpha, beta, is_maximizing, stats=None, tt=None, first_move=None, deadline=None, ordering=None, rules=RULES):
+    if stats is None:
+        stats = SearchStats()
+    if is_maximizing:
+        score, move = negamax(node, depth, alpha, beta, 1, stats, tt, first_move, deadline, ordering, rules)
+        return score, best_move_of(score, move), stats
+    score, move = negamax(node, depth, -beta, -alpha, -1, stats, tt, first_move, deadline, ordering, rules)
+    return -score, best_move_of(score, move), stats
+
+#Principal variation search for the AI's move with an aspiration window: the first search only
+#looks window points either side of guess (the score of the AI's previous turn) and the side that
+#fails is opened and searched again, unless it failed on +-inf: that bound is already the score.
+#A guess of None or +-inf searches the full window.
+#Returns (score, principal variation, stats); the move is pv[0].
+def pvs(node, depth, guess=None, window=ASPIRATION_WINDOW, stats=None, tt=None, first_move=None, deadline=None, ordering=None, rules=RULES):
+    if stats is None:
+        stats = SearchStats()
+    alpha, beta = float('-inf'), float('inf')
+    if guess is not None and math.isfinite(guess):
+        alpha, beta = guess - window, guess + window
+    while True:
+        score, pv = negamax(node, depth, alpha, beta, 1, stats, tt, first_move, deadline, ordering, rules, null_window=True, want_pv=True)
+        if alpha < score < beta or math.isinf(score):
+            return score, pv, stats
+        if score <= alpha:
+            alpha = float('-inf')
+        else:
+            beta = float('inf')
@@ -0,0 +1,163 @@
+import os
+import struct
+
+from .rules import RULES, Rules
+
+RECORDS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "game_records.bin") # games played in the GUI
+MAGIC = b"T58R"
+VERSION = 1
+HEADER = struct.Struct("<4sBQQQB") # magic, version, target, start_low, start_high, number of multipliers
+LENGTH = struct.Struct("<I") # bytes of the game that follows
+GAME = struct.Struct("<QBH") # start number, engine names, moves
+MOVE = struct.Struct("<BBBfI") # multiplier index, engine index, depth, time in ms, nodes
+MAX_NODES = 2 ** 32 - 1
+
+
+#One game: the start number and every move as (multiplier, engine, depth, time_ms, nodes).
+#Moves alternate between the side that moves first and the other, engine names who played it
+#("human", "random", "minimax"...), depth/time_ms/nodes are 0 for moves that weren't searched.
+class GameRecord:
+    __slots__ = ("start_number", "moves")
+
+    def __init__(self, start_number=None):
+        self.start_number = start_number
+        self.moves = []
+
+    def add_move(self, multiplier, engine, depth=0, time_ms=0.0, nodes=0):
+        self.moves.append((multiplier, engine, depth, time_ms, nodes))
+
+    #Engine names are stored once per game and the moves refer to them by index
+    def encode(self, rules=RULES):
+        engines = list(dict.fromkeys(move[1] for move in self.moves))
+        parts = [GAME.pack(self.start_number, len(engines), len(self.moves))]
+        for engine in engines:
+            name = engine.encode()
+            parts.append(bytes([len(name)]) + name)
+        for multiplier, engine, depth, time_ms, nodes in self.moves:
+            parts.append(MOVE.pack(rules.multipliers.index(multiplier), engines.index(engine), min(depth, 255), time_ms, min(nodes, MAX_NODES)))
+        data = b"".join(parts)
+        return LENGTH.pack(len(data)) + data
+
+    @staticmethod
+    def decode(data, rules=RULES):
+        start_number, engine_count, move_count = GAME.unpack_from(data)
+        offset = GAME.size
+        engines = []
+        for _ in range(engine_count):
+            length = data[offset]
+            engines.append(data[offset + 1:offset + 1 + length].decode())
+            offset += 1 + length
+        record = GameRecord(start_number)
+        for index, engine, depth, time_ms, nodes in MOVE.iter_unpack(data[offset:offset + move_count * MOVE.size]):
+            record.moves.append((rules.multipliers[index], engines[engine], depth, time_ms, nodes))
+        return record
+
+    #(number, bank, (points of the side that moved first, of the other)) at the start and after
+    #every move, the same scoring as play_game(): whoever reaches the target takes the bank.
+    #zip(record.moves, record.positions()) pairs every move with the position it was played in.
+    def positions(self, rules=RULES):
+        state = (self.start_number, 0, 0, 0, True) # the side that moved first in the AI's place
+        yield self.start_number, 0, (0, 0)
+        for move in self.moves:
+            state = rules.apply(state, move[0])
+            number, first_points, second_points, bank, _ = state
+            yield number, bank, (first_points, second_points)
+
+    def final_points(self, rules=RULES):
+        for position in self.positions(rules):
+            pass
+        return position[2]
+
+
+#Appends games to a record file, writing the header (the rules) when the file is new.
+#Appending games of other rules to an existing file is an error, and a game cut off by an
+#interrupted writer is dropped first so the next one doesn't land in the middle of it.
+class RecordWriter:
+    def __init__(self, path=RECORDS_PATH, rules=RULES):
+        self.rules = rules
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                existing = read_header(f)
+                if existing != rules:
+                    raise ValueError(f"{path} holds games of {existing}, not {rules}")
+                end = complete_end(f)
+            if end < os.path.getsize(path):
+                os.truncate(path, end)
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(HEADER.pack(MAGIC, VERSION, rules.target, rules.start_low, rules.start_high, len(rules.multipliers)))
+            self.file.write(struct.pack(f"<{len(rules.multipliers)}H", *rules.multipliers))
+        self.games = 0
+
+    def write(self, record):
+        self.file.write(record.encode(self.rules))
+        self.games += 1
+
+    #Already encoded games (GameRecord.encode()), as sent back by pool workers
+    def write_encoded(self, data):
+        self.file.write(data)
+        self.games += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+#Rules of the games in an open record file, leaves the file at the first game
+def read_header(f):
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError("not a game record file (too short)")
+    magic, version, target, start_low, start_high, count = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} game record file")
+    multipliers = struct.unpack(f"<{count}H", f.read(2 * count))
+    return Rules(target, multipliers, start_low, start_high)
+
+
+#The encoded games of an open record file one by one, without decoding them. A game cut off
+#at the end of the file (an interrupted writer) is skipped.
+def iter_encoded(f):
+    while True:
+        length = f.read(LENGTH.size)
+        if len(length) < LENGTH.size:
+            return
+        length, = LENGTH.unpack(length)
+        data = f.read(length)
+        if len(data) < length:
+            return
+        yield data
+
+
+#Offset after the last complete game, found by skipping from length to length
+def complete_end(f):
+    size = os.fstat(f.fileno()).st_size
+    end = f.tell()
+    while True:
+        length = f.read(LENGTH.size)
+        if len(length) < LENGTH.size:
+            return end
+        next_end = end + LENGTH.size + LENGTH.unpack(length)[0]
+        if next_end > size:
+            return end
+        f.seek(next_end)
+        end = next_end
+
+
+#Streams the games of a record file; only one game is in memory at a time.
+#Returns (rules, generator of GameRecord).
+def read_records(path=RECORDS_PATH):
+    f = open(path, "rb")
+    rules = read_header(f)
+
+    def games():
+        with f:
+            for data in iter_encoded(f):
+                yield GameRecord.decode(data, rules)
+    return rules, games()
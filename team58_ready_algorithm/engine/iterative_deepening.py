@@ -0,0 +1,58 @@
+import time
+
+from .rules import RULES
+from .search_stats import SearchStats
+
+
+#Raised from inside the search when its Deadline expires
+class SearchTimeout(Exception):
+    pass
+
+
+#Point in perf_counter() time where the search stops. It is an object rather than a float
+#so another thread (the GUI) can move it: force() ends the search at the next check.
+class Deadline:
+    def __init__(self, at=float('inf')):
+        self.at = at
+
+    def expired(self):
+        return time.perf_counter() > self.at
+
+    def force(self):
+        self.at = 0.0
+
+
+#Deepest search that can still matter: every move multiplies by at least the smallest multiplier.
+def plies_to_target(current_number, rules=RULES):
+    return max(1, rules.max_plies(current_number))
+
+
+#Anytime search: runs search(node, depth, ...) for depth 1, 2, 3... until the per-move
+#time budget runs out and returns the result of the deepest completed iteration as
+#(score, move, stats, depth). stats (SearchStats) counts the nodes of every iteration,
+#including the aborted one. Each iteration tries the previous best move first.
+#search is the alphabeta() of the calling script. Depth 1 always completes so there is a move.
+#A Deadline passed in is tightened to the budget and can still be forced from outside.
+def iterative_deepening(search, node, time_budget_ms=5, max_depth=None, tt=None, ordering=None, stats=None, deadline=None, rules=RULES):
+    start_time = time.perf_counter()
+    if deadline is None:
+        deadline = Deadline()
+    deadline.at = min(deadline.at, start_time + time_budget_ms / 1000)
+    if max_depth is None:
+        max_depth = plies_to_target(node.current_number, rules)
+    if stats is None:
+        stats = SearchStats()
+    best_score, best_move, completed_depth = None, None, 0
+    for depth in range(1, max_depth + 1):
+        try:
+            score, move, _ = search(node, depth, float('-inf'), float('inf'), True, stats, tt,
+                                    first_move=best_move, deadline=deadline if depth > 1 else None,
+                                    ordering=ordering, rules=rules)
+        except SearchTimeout:
+            break
+        best_score, best_move, completed_depth = score, move, depth
+        if deadline.expired():
+            break
+    stats.depth = completed_depth
+    stats.time_ms = (time.perf_counter() - start_time) * 1000
+    return best_score, best_move, stats, completed_depth
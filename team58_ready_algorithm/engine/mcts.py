@@ -0,0 +1,154 @@
+import math
+import time
+
+import numpy as np
+
+from .core import PLAYOUTS
+from .rules import RULES
+from .search_stats import SearchStats
+
+EXPLORATION = 1.4 # UCT exploration constant, about sqrt(2) for rewards in [0, 1]
+ROLLOUT_BATCH = 16 # random playouts run together from every new leaf
+
+
+class MCTSNode:
+    __slots__ = ("current_number", "ai_points", "player_points", "game_bank", "ai_to_move", "children", "visits", "ai_wins")
+    def __init__(self, current_number, ai_points, player_points, game_bank, ai_to_move):
+        self.current_number = current_number
+        self.ai_points = ai_points
+        self.player_points = player_points
+        self.game_bank = game_bank
+        self.ai_to_move = ai_to_move
+        self.children = [] # in rules.multipliers order, grows by one per expansion
+        self.visits = 0
+        self.ai_wins = 0 # playouts through this node the AI won
+
+    def state(self):
+        return self.current_number, self.ai_points, self.player_points, self.game_bank, self.ai_to_move
+
+    #The position after multiplier
+    def make_child(self, multiplier, rules=RULES):
+        return MCTSNode(*rules.apply(self.state(), multiplier))
+
+
+#Random playouts from one position (below the target), all at once: the moves of every ply
+#are drawn up front, for as many plies as the slowest game can last, and how far each playout
+#got is a running product. A number is even (a multiple of 5) once any factor was, so points
+#and bank come from running ORs and the numbers themselves are never built; the product is
+#kept as a float, which cannot overflow. Moves after a playout reached the target are masked out.
+#Returns how many the AI won (a tie is a loss, as in play_game()) and the number of moves played.
+def rollout_batch(node, size, rng, rules=RULES):
+    plies = rules.max_plies(node.current_number)
+    multipliers = np.array(rules.multipliers)
+    factors = multipliers[rng.integers(0, len(multipliers), (size, plies))]
+    reached = node.current_number * factors.cumprod(axis=1, dtype=np.float64) >= rules.target
+    played = np.ones((size, plies), dtype=np.int64)
+    played[:, 1:] = ~reached[:, :-1]
+    even = np.logical_or.accumulate(factors % 2 == 0, axis=1) | (node.current_number % 2 == 0)
+    five = np.logical_or.accumulate(factors % 5 == 0, axis=1) | (node.current_number % 5 == 0)
+    sign = ply_signs(plies, node.ai_to_move)
+    diffs = (np.where(even, -1, 1) * played * sign).sum(axis=1)
+    banks = (five * played).sum(axis=1) + node.game_bank
+    diffs += sign[reached.argmax(axis=1)] * banks # whoever reaches the target takes the bank
+    return int(np.count_nonzero(diffs > node.player_points - node.ai_points)), int(played.sum())
+
+
+_ply_signs = {}
+
+
+#+1 on the AI's plies and -1 on the player's, for a playout of plies moves
+def ply_signs(plies, ai_to_move):
+    key = (plies, ai_to_move)
+    if key not in _ply_signs:
+        first = 1 if ai_to_move else -1
+        _ply_signs[key] = np.array([first if ply % 2 == 0 else -first for ply in range(plies)], dtype=np.int64)
+    return _ply_signs[key]
+
+
+#UCT search for the AI. The tree is kept between moves: search() looks for the new position
+#among the player's replies to the move it played last time and keeps that subtree, so one
+#MCTS object is used for a whole game.
+class MCTS:
+    def __init__(self, exploration=EXPLORATION, rollout_batch=ROLLOUT_BATCH, seed=None, rules=RULES):
+        self.rules = rules
+        self.exploration = exploration
+        self.rollout_batch = rollout_batch
+        self.rng = np.random.default_rng(seed)
+        self.root = None
+        self.reused = 0 # searches that started from a kept subtree
+
+    def find_root(self, state):
+        if self.root is not None:
+            if self.root.state() == state:
+                return self.root
+            for child in self.root.children:
+                if child.state() == state:
+                    self.reused += 1
+                    return child
+        return MCTSNode(*state)
+
+    #Child to descend into, chosen by UCB1 from the point of view of the side to move
+    def select_child(self, node):
+        log_visits = math.log(node.visits)
+        best_child = None
+        best_value = float('-inf')
+        for child in node.children:
+            win_rate = child.ai_wins / child.visits
+            if not node.ai_to_move:
+                win_rate = 1 - win_rate
+            value = win_rate + self.exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best_value = value
+                best_child = child
+        return best_child
+
+    #Returns (AI win rate of the chosen move, multiplier, stats) for the AI to move.
+    #Stops after playouts playouts, after time_budget_ms, or when deadline (a Deadline) expires,
+    #whichever comes first; the most visited move is played. Every move gets one batch before
+    #any gets a second, so fewer than len(multipliers) * rollout_batch playouts don't try them all.
+    def search(self, current_number, ai_points, player_points, game_bank, playouts=PLAYOUTS, time_budget_ms=None, stats=None, deadline=None):
+        if stats is None:
+            stats = SearchStats()
+        target = self.rules.target
+        multipliers = self.rules.multipliers
+        root = self.find_root((current_number, ai_points, player_points, game_bank, True))
+        self.root = root
+        if current_number >= target:
+            return float(root.ai_points > root.player_points), None, stats
+        stop_at = time.perf_counter() + time_budget_ms / 1000 if time_budget_ms else None
+        done = 0
+        while playouts is None or done < playouts:
+            if stop_at is not None and time.perf_counter() >= stop_at:
+                break
+            if deadline is not None and deadline.expired():
+                break
+            # selection
+            node = root
+            path = [root]
+            while node.current_number < target and len(node.children) == len(multipliers):
+                node = self.select_child(node)
+                path.append(node)
+            # expansion
+            if node.current_number < target:
+                node = node.make_child(multipliers[len(node.children)], self.rules)
+                path[-1].children.append(node)
+                path.append(node)
+            # simulation
+            if node.current_number >= target:
+                ai_wins = self.rollout_batch if node.ai_points > node.player_points else 0
+                positions = 0
+            else:
+                ai_wins, positions = rollout_batch(node, self.rollout_batch, self.rng, self.rules)
+            # backpropagation
+            for visited in path:
+                visited.visits += self.rollout_batch
+                visited.ai_wins += ai_wins
+            done += self.rollout_batch
+            stats.nodes += len(path) + positions
+            stats.depth = max(stats.depth, len(path) - 1)
+
+        if not root.children:
+            return 0.0, None, stats
+        best = max(root.children, key=lambda child: (child.visits, child.ai_wins)) # equal visits: the better win rate
+        self.root = best
+        return best.ai_wins / best.visits, multipliers[root.children.index(best)], stats
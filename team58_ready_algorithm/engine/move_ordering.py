@@ -0,0 +1,80 @@
+from .rules import RULES
+
+HEURISTICS = ("hash", "killer", "history", "static")
+
+
+#Pluggable move ordering for alphabeta.
+#  hash    - the move suggested by the caller (previous iteration / TT entry) goes first
+#  killer  - moves that caused a cutoff at the same ply earlier in this search
+#  history - moves that caused cutoffs in earlier searches of this game
+#  static  - the child's evaluate() score
+#A "move" for history is (side, last digit, multiplier): the last digit of the current
+#number and the multiplier fix the parity/bank outcome of the product.
+class MoveOrdering:
+    def __init__(self, evaluate, update_points_and_bank, heuristics=HEURISTICS, killers_per_ply=2, rules=RULES):
+        self.evaluate = evaluate # the calling script's evaluate()
+        self.update_points_and_bank = update_points_and_bank
+        self.rules = rules
+        self.heuristics = tuple(heuristics)
+        self.killers_per_ply = killers_per_ply
+        self.killers = {} # ply -> most recent cutoff moves, newest first
+        self.history = {} # (is_maximizing, last digit, multiplier) -> score, kept across turns
+        self.cutoffs = 0 # stats of the current search
+        self.first_move_cutoffs = 0
+        self.total_cutoffs = 0 # stats of all searches of this game
+        self.total_first_move_cutoffs = 0
+
+    #Called at the start of every AI turn: killers are ply-relative so they are dropped,
+    #history is aged so older turns count less.
+    def new_search(self):
+        self.killers = {}
+        self.history = {move: score // 2 for move, score in self.history.items() if score > 1}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def order_moves(self, node, is_maximizing, hash_move=None):
+        killers = self.killers.get(node.depth, []) if "killer" in self.heuristics else []
+        last_digit = node.current_number % 10
+
+        def sort_key(multiplier):
+            key = []
+            if "hash" in self.heuristics:
+                key.append(multiplier == hash_move)
+            if "killer" in self.heuristics:
+                key.append(multiplier in killers)
+            if "history" in self.heuristics:
+                key.append(self.history.get((is_maximizing, last_digit, multiplier), 0))
+            if "static" in self.heuristics:
+                score = self.child_score(node, multiplier, is_maximizing)
+                key.append(score if is_maximizing else -score)
+            return key
+
+        return sorted(self.rules.multipliers, key=sort_key, reverse=True)
+
+    def child_score(self, node, multiplier, is_maximizing):
+        new_number = node.current_number * multiplier
+        points, bank = self.update_points_and_bank(new_number)
+        if is_maximizing:
+            return self.evaluate(new_number, node.ai_points + points, node.player_points, node.game_bank + bank, node.is_ai_turn, self.rules)
+        return self.evaluate(new_number, node.ai_points, node.player_points + points, node.game_bank + bank, node.is_ai_turn, self.rules)
+
+    #index is the position of multiplier in the ordered move list, depth the remaining depth
+    def record_cutoff(self, node, multiplier, index, depth, is_maximizing):
+        self.cutoffs += 1
+        self.total_cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+            self.total_first_move_cutoffs += 1
+        killers = self.killers.setdefault(node.depth, [])
+        if multiplier in killers:
+            killers.remove(multiplier)
+        killers.insert(0, multiplier)
+        del killers[self.killers_per_ply:]
+        key = (is_maximizing, node.current_number % 10, multiplier)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    #Share of cutoffs produced by the first move tried; 1.0 is perfect ordering
+    def first_move_cutoff_rate(self, total=False):
+        cutoffs = self.total_cutoffs if total else self.cutoffs
+        first = self.total_first_move_cutoffs if total else self.first_move_cutoffs
+        return first / cutoffs if cutoffs else 0.0
@@ -0,0 +1,142 @@
+import os
+import sqlite3
+
+from .rules import RULES
+from .transposition import TranspositionTable
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "position_cache.sqlite")
+MAX_ENTRIES = 1000000 # positions kept on disk per namespace, the shallowest searches are dropped first
+EVICT_TO = 0.9 # eviction leaves this fraction of max_entries, so the next one is many flushes away
+MIN_DEPTH = 2 # nodes searched less deep than this are cheaper to search again than to look up
+MEMORY_SIZE = 100000 # positions kept in memory in front of the file
+FLUSH_EVERY = 1000 # stores buffered before they are written in one transaction
+
+_open_caches = {} # (path, rules, weights) -> PositionCache of this process
+
+
+#Transposition table backed by a sqlite file, so searches of other processes and later runs
+#start from the positions already searched. Used through the tt argument of minimax() and
+#alphabeta() like a TranspositionTable; the in-memory table in front of it is an LRU of the
+#positions read or stored by this process.
+#Scores depend on the rules and the evaluate() weights, so every (rules, weights) pair gets its
+#own namespace in the file. The file is in WAL mode: any number of processes read while one
+#writes, and stores are written in batches by flush() (call it when a search or game is done).
+class PositionCache(TranspositionTable):
+    def __init__(self, path=CACHE_PATH, rules=RULES, weights=None, max_entries=MAX_ENTRIES, min_depth=MIN_DEPTH, memory_size=MEMORY_SIZE):
+        super().__init__(memory_size)
+        self.path = path
+        self.max_entries = max_entries
+        self.min_depth = min_depth
+        self.pending = {} # key -> entry not written yet
+        self.missing = set() # keys not in the file when they were looked up
+        self.reads = 0 # lookups that went to the file
+        self.pid = os.getpid()
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS namespaces (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS positions (namespace INTEGER, number INTEGER, diff INTEGER, bank INTEGER, "
+                                "maximizing INTEGER, depth INTEGER, flag INTEGER, score REAL, move INTEGER, "
+                                "PRIMARY KEY (namespace, number, diff, bank, maximizing)) WITHOUT ROWID")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS positions_depth ON positions (namespace, depth)")
+        name = f"{rules!r} weights={tuple(weights) if weights is not None else None}"
+        self.connection.execute("INSERT OR IGNORE INTO namespaces (name) VALUES (?)", (name,))
+        self.namespace = self.connection.execute("SELECT id FROM namespaces WHERE name = ?", (name,)).fetchone()[0]
+        self.rows = self._count_rows() # at least the rows of this namespace in the file, counted again before evicting
+
+    def probe(self, key, depth, alpha=float('-inf'), beta=float('inf')):
+        if depth < self.min_depth:
+            return None, None
+        if key not in self.entries and key not in self.missing:
+            self.reads += 1
+            row = self.connection.execute("SELECT depth, flag, score, move FROM positions WHERE namespace = ? AND number = ? "
+                                          "AND diff = ? AND bank = ? AND maximizing = ?", (self.namespace, *key)).fetchone()
+            if row is None:
+                if len(self.missing) >= self.max_size:
+                    self.missing.clear()
+                self.missing.add(key)
+            else:
+                self.entries[key] = row
+                if len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+        return super().probe(key, depth, alpha, beta)
+
+    def store(self, key, depth, flag, score, move):
+        if depth < self.min_depth:
+            return
+        stores = self.stores
+        super().store(key, depth, flag, score, move)
+        if self.stores == stores: # a deeper search of the position is already kept
+            return
+        self.missing.discard(key)
+        self.pending[key] = (depth, flag, score, move)
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+
+    #Writes the pending stores in one transaction, keeping the deeper search when another
+    #process stored the position too. When the namespace may hold more than max_entries
+    #positions it is counted and its shallowest positions are dropped down to EVICT_TO of it.
+    def flush(self):
+        if not self.pending:
+            return
+        rows = [(self.namespace, *key, *entry) for key, entry in self.pending.items()]
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.executemany("INSERT INTO positions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                                        "ON CONFLICT (namespace, number, diff, bank, maximizing) DO UPDATE SET "
+                                        "depth = excluded.depth, flag = excluded.flag, score = excluded.score, move = excluded.move "
+                                        "WHERE excluded.depth >= positions.depth", rows)
+            self.rows += len(rows) # an update counts as a new row too, so this only overestimates
+            if self.rows > self.max_entries:
+                self.rows = self._count_rows()
+                excess = self.rows - int(self.max_entries * EVICT_TO)
+                if excess > 0:
+                    self.connection.execute("DELETE FROM positions WHERE namespace = ? AND (number, diff, bank, maximizing) IN "
+                                            "(SELECT number, diff, bank, maximizing FROM positions WHERE namespace = ? ORDER BY depth LIMIT ?)",
+                                            (self.namespace, self.namespace, excess))
+                    self.evictions += excess
+                    self.rows -= excess
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.pending.clear()
+        self.missing.clear() # other processes may have stored them meanwhile
+
+    #Forgets this namespace, in memory and in the file
+    def clear(self):
+        super().clear()
+        self.pending.clear()
+        self.missing.clear()
+        self.reads = 0
+        self.connection.execute("DELETE FROM positions WHERE namespace = ?", (self.namespace,))
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _count_rows(self):
+        return self.connection.execute("SELECT COUNT(*) FROM positions WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+
+    #Positions of this namespace in the file
+    def __len__(self):
+        self.flush()
+        return self._count_rows()
+
+
+#One PositionCache per process and file, so every game of a run (or of a pool worker) shares
+#its memory layer. A forked worker gets its own connection instead of the parent's.
+def open_cache(path=CACHE_PATH, rules=RULES, weights=None):
+    key = (path, rules, tuple(weights) if weights is not None else None)
+    cache = _open_caches.get(key)
+    if cache is None or cache.pid != os.getpid():
+        cache = PositionCache(path, rules, weights)
+        _open_caches[key] = cache
+    return cache
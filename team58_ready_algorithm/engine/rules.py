@@ -0,0 +1,89 @@
+#Calculates points and updates the bank based on the current number.
+def update_points_and_bank(number):
+    points, bank = 0, 0
+    if number % 2 == 0:
+        points -= 1
+    else:
+        points += 1
+    if number % 10 == 0 or number % 10 == 5:
+        bank += 1
+    return points, bank
+
+
+#The rules of the game: the number to reach, the moves and the start numbers.
+#Every engine, simulation and screen takes a Rules object (RULES, the classic game, by default)
+#instead of hard-coding them. Rules are immutable and hashable so they can key caches.
+class Rules:
+    __slots__ = ("target", "multipliers", "start_low", "start_high")
+
+    def __init__(self, target=5000, multipliers=(2, 3, 4), start_low=25, start_high=40):
+        multipliers = tuple(multipliers)
+        if not multipliers or any(multiplier < 2 for multiplier in multipliers) or len(set(multipliers)) != len(multipliers):
+            raise ValueError(f"multipliers must be distinct integers >= 2: {multipliers}")
+        if not 1 <= start_low <= start_high < target:
+            raise ValueError(f"start numbers {start_low}-{start_high} must be positive and below the target {target}")
+        object.__setattr__(self, "target", target)
+        object.__setattr__(self, "multipliers", multipliers)
+        object.__setattr__(self, "start_low", start_low)
+        object.__setattr__(self, "start_high", start_high)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Rules are immutable")
+
+    def _key(self):
+        return self.target, self.multipliers, self.start_low, self.start_high
+
+    def __eq__(self, other):
+        return isinstance(other, Rules) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __reduce__(self): # pool workers get a copy
+        return Rules, self._key()
+
+    def __repr__(self):
+        return f"Rules(target={self.target}, multipliers={self.multipliers}, start_low={self.start_low}, start_high={self.start_high})"
+
+    @property
+    def start_numbers(self):
+        return range(self.start_low, self.start_high + 1)
+
+    def random_start(self, rng):
+        return rng.randint(self.start_low, self.start_high)
+
+    def random_move(self, rng):
+        return rng.choice(self.multipliers)
+
+    #The game after the side to move plays multiplier. state is (current_number, ai_points,
+    #player_points, game_bank, ai_to_move) and so is the result; the side that reaches the target
+    #also takes the bank.
+    def apply(self, state, multiplier):
+        current_number, ai_points, player_points, game_bank, ai_to_move = state
+        current_number *= multiplier
+        points, bank = update_points_and_bank(current_number)
+        game_bank += bank
+        if current_number >= self.target:
+            points += game_bank
+        if ai_to_move:
+            ai_points += points
+        else:
+            player_points += points
+        return current_number, ai_points, player_points, game_bank, not ai_to_move
+
+    #Most moves the game can still last from current_number (every move the smallest multiplier)
+    def max_plies(self, current_number):
+        plies = 0
+        smallest = min(self.multipliers)
+        while current_number < self.target:
+            current_number *= smallest
+            plies += 1
+        return plies
+
+
+RULES = Rules()
+
+
+#"5000" or "1e9" -> int, for the command line options
+def parse_target(text):
+    return int(float(text)) if "e" in text.lower() else int(text)
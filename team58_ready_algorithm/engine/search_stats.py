@@ -0,0 +1,78 @@
+#Statistics of one search (one AI turn) or, after merge(), of a whole game or run.
+#nodes is always counted. The per-ply counters and leaf evaluations are only kept when
+#detailed=True; the search functions check the flag before touching them, so they cost
+#nothing when off.
+class SearchStats:
+    __slots__ = ("nodes", "detailed", "leaf_evaluations", "nodes_per_ply", "cutoffs_per_ply", "depth", "time_ms", "searches")
+
+    def __init__(self, detailed=False):
+        self.nodes = 0
+        self.detailed = detailed
+        self.leaf_evaluations = 0
+        self.nodes_per_ply = [] # nodes_per_ply[0] is the root
+        self.cutoffs_per_ply = []
+        self.depth = 0 # nominal depth searched (deepest completed iteration for iterative deepening)
+        self.time_ms = 0.0
+        self.searches = 0 # number of turns merged into this object
+
+    def record_node(self, ply):
+        while len(self.nodes_per_ply) <= ply:
+            self.nodes_per_ply.append(0)
+        self.nodes_per_ply[ply] += 1
+
+    def record_cutoff(self, ply):
+        while len(self.cutoffs_per_ply) <= ply:
+            self.cutoffs_per_ply.append(0)
+        self.cutoffs_per_ply[ply] += 1
+
+    @property
+    def max_depth(self):
+        if self.nodes_per_ply:
+            return len(self.nodes_per_ply) - 1
+        return self.depth
+
+    @property
+    def cutoffs(self):
+        return sum(self.cutoffs_per_ply)
+
+    #b with 1 + b + ... + b^d = nodes per search, d the deepest ply reached
+    @property
+    def effective_branching_factor(self):
+        searches = max(1, self.searches)
+        nodes = self.nodes / searches
+        depth = self.max_depth
+        if depth == 0 or nodes <= 1:
+            return 0.0
+        low, high = 0.0, max(2.0, nodes)
+        for _ in range(60):
+            b = (low + high) / 2
+            total = sum(b ** i for i in range(depth + 1))
+            if total < nodes:
+                low = b
+            else:
+                high = b
+        return (low + high) / 2
+
+    #Adds another turn's (or game's) stats into this one
+    def merge(self, other):
+        self.nodes += other.nodes
+        self.leaf_evaluations += other.leaf_evaluations
+        for ply, count in enumerate(other.nodes_per_ply):
+            while len(self.nodes_per_ply) <= ply:
+                self.nodes_per_ply.append(0)
+            self.nodes_per_ply[ply] += count
+        for ply, count in enumerate(other.cutoffs_per_ply):
+            while len(self.cutoffs_per_ply) <= ply:
+                self.cutoffs_per_ply.append(0)
+            self.cutoffs_per_ply[ply] += count
+        self.depth = max(self.depth, other.depth)
+        self.time_ms += other.time_ms
+        self.searches += max(1, other.searches)
+        return self
+
+    def summary(self):
+        text = f"nodes {self.nodes}, max depth {self.max_depth}, time {self.time_ms:.4f} ms"
+        if self.detailed:
+            text += (f", leaf evaluations {self.leaf_evaluations}, EBF {self.effective_branching_factor:.2f}"
+                     f", nodes per ply {self.nodes_per_ply}, cutoffs per ply {self.cutoffs_per_ply}")
+        return text
@@ -0,0 +1,128 @@
+import os
+import struct
+
+from .rules import RULES, update_points_and_bank
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "solved_table.bin") # classic rules only
+RECORD = struct.Struct("<IBB") # current_number, game_bank, best multiplier
+
+_loaded_tables = {} # path (or Rules for other rules) -> table, so the file is read once per process
+_memos = {} # Rules -> {canonical state: (value, best multiplier)}, shared by every search of the process
+
+
+#The already collected points only shift the final margin, and what is left of the game only
+#depends on how far the target is, whether the number is even (its products stay even) and
+#whether it is a multiple of 5 (so are its products). remaining = ceil(target / number) is the
+#smallest product of multipliers that reaches the target, so numbers with the same
+#(remaining, even, five, bank) are the same position. There are far fewer of these than
+#reachable numbers, which keeps targets of 10^9 and more cheap.
+def canonical_state(number, bank, rules=RULES):
+    return (rules.target + number - 1) // number, number % 2 == 0, number % 5 == 0, bank
+
+
+#Backward induction on canonical states, memoized in memo.
+#Returns (margin the player to move gets with perfect play, best multiplier).
+def solve_canonical(state, memo, rules=RULES):
+    if state in memo:
+        return memo[state]
+    remaining, even, five, bank = state
+    best_value = None
+    best_move = None
+    for multiplier in rules.multipliers:
+        new_even = even or multiplier % 2 == 0
+        new_five = five or multiplier % 5 == 0
+        points = -1 if new_even else 1
+        new_bank = bank + 1 if new_five else bank
+        if multiplier >= remaining: # reached the target and takes the bank, like in game_loop()
+            value = points + new_bank
+        else:
+            new_state = ((remaining + multiplier - 1) // multiplier, new_even, new_five, new_bank)
+            value = points - solve_canonical(new_state, memo, rules)[0]
+        if best_value is None or value > best_value:
+            best_value = value
+            best_move = multiplier
+    memo[state] = (best_value, best_move)
+    return best_value, best_move
+
+
+#(perfect-play margin for the player to move, best multiplier) of a position
+def solve_state(number, bank, rules=RULES):
+    return solve_canonical(canonical_state(number, bank, rules), _memos.setdefault(rules, {}), rules)
+
+
+#Points margin (mover minus opponent) the player to move gets from playing multiplier.
+def move_value(number, bank, multiplier, rules=RULES):
+    new_number = number * multiplier
+    points, bank_gain = update_points_and_bank(new_number)
+    new_bank = bank + bank_gain
+    if new_number >= rules.target:
+        return points + new_bank
+    return points - solve_state(new_number, new_bank, rules)[0]
+
+
+#Solves every position reachable from the start numbers.
+#Returns (moves, values), both keyed on (current_number, game_bank).
+def solve(start_numbers=None, rules=RULES):
+    if start_numbers is None:
+        start_numbers = rules.start_numbers
+    values = {}
+    moves = {}
+    stack = [(start_number, 0) for start_number in start_numbers]
+    while stack:
+        key = stack.pop()
+        if key in values:
+            continue
+        number, bank = key
+        values[key], moves[key] = solve_state(number, bank, rules)
+        for multiplier in rules.multipliers:
+            new_number = number * multiplier
+            if new_number < rules.target:
+                stack.append((new_number, bank + update_points_and_bank(new_number)[1]))
+    return moves, values
+
+
+def save_table(moves, path=TABLE_PATH):
+    with open(path, "wb") as f:
+        for (number, bank), multiplier in sorted(moves.items()):
+            f.write(RECORD.pack(number, bank, multiplier))
+
+
+def load_table(path=TABLE_PATH):
+    moves = {}
+    with open(path, "rb") as f:
+        data = f.read()
+    for number, bank, multiplier in RECORD.iter_unpack(data):
+        moves[(number, bank)] = multiplier
+    return moves
+
+
+#Perfect-play move table, read from disk (or solved and written on first use).
+#Tables of other rules start empty and are filled by solved_move().
+def get_table(path=TABLE_PATH, rules=RULES):
+    if rules != RULES:
+        return _loaded_tables.setdefault(rules, {})
+    if path not in _loaded_tables:
+        if os.path.exists(path):
+            _loaded_tables[path] = load_table(path)
+        else:
+            moves, _ = solve()
+            save_table(moves, path)
+            _loaded_tables[path] = moves
+    return _loaded_tables[path]
+
+
+#O(1) lookup; positions outside the table (custom starts, other rules) are solved once and added.
+def solved_move(table, current_number, game_bank, rules=RULES):
+    key = (current_number, game_bank)
+    if key not in table:
+        table[key] = solve_state(current_number, game_bank, rules)[1]
+    return table[key]
+
+
+if __name__ == "__main__":
+    moves, values = solve()
+    save_table(moves)
+    print(f"Solved {len(moves)} positions, table written to {TABLE_PATH} ({len(moves) * RECORD.size} bytes)")
+    for start_number in RULES.start_numbers:
+        value = values[(start_number, 0)]
+        print(f"Start {start_number}: first player margin {value:+d}, best move x{moves[(start_number, 0)]}")
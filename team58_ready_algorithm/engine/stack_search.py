@@ -0,0 +1,116 @@
+from .rules import RULES
+from .search_stats import SearchStats
+
+
+#minimax/alphabeta without Node objects and without recursion.
+#The search state lives in preallocated per-ply lists that are reused by every search,
+#so expanding a node only writes a few slots instead of building a Node.
+#Moves, scores, tie-breaking and visited node counts are the same as minimax()/alphabeta().
+class StackSearch:
+    def __init__(self, evaluate, max_depth=16, rules=RULES):
+        self.evaluate = evaluate # the calling script's evaluate()
+        self.rules = rules
+        self._allocate(max_depth)
+
+    def _allocate(self, max_depth):
+        size = max_depth + 1
+        self.max_depth = max_depth
+        self.numbers = [0] * size
+        self.ai_points = [0] * size
+        self.player_points = [0] * size
+        self.banks = [0] * size
+        self.next_child = [0] * size # index into rules.multipliers of the next child to expand
+        self.best_scores = [0.0] * size
+        self.best_moves = [None] * size
+        self.alphas = [0.0] * size
+        self.betas = [0.0] * size
+
+    def minimax(self, current_number, ai_points, player_points, game_bank, depth, stats=None):
+        return self._search(current_number, ai_points, player_points, game_bank, depth, float('-inf'), float('inf'), False, stats)
+
+    def alphabeta(self, current_number, ai_points, player_points, game_bank, depth, alpha=float('-inf'), beta=float('inf'), stats=None):
+        return self._search(current_number, ai_points, player_points, game_bank, depth, alpha, beta, True, stats)
+
+    #Returns (score, move, stats); the AI (maximizing) is to move at the root.
+    #Nodes are counted in a local and added to stats at the end, the per-ply counters only when stats.detailed.
+    def _search(self, current_number, ai_points, player_points, game_bank, depth, alpha, beta, prune, stats):
+        if stats is None:
+            stats = SearchStats()
+        detailed = stats.detailed
+        if detailed:
+            stats.record_node(0)
+        evaluate = self.evaluate
+        rules = self.rules
+        target = rules.target
+        multipliers = rules.multipliers
+        moves = len(multipliers)
+        if current_number >= target or depth == 0:
+            stats.nodes += 1
+            if detailed:
+                stats.leaf_evaluations += 1
+            return evaluate(current_number, ai_points, player_points, game_bank, True, rules), None, stats
+        if depth > self.max_depth:
+            self._allocate(depth)
+        numbers, ais, players, banks = self.numbers, self.ai_points, self.player_points, self.banks
+        next_child, best_scores, best_moves = self.next_child, self.best_scores, self.best_moves
+        alphas, betas = self.alphas, self.betas
+        inf = float('inf')
+
+        numbers[0], ais[0], players[0], banks[0] = current_number, ai_points, player_points, game_bank
+        next_child[0], best_scores[0], best_moves[0] = 0, -inf, None
+        alphas[0], betas[0] = alpha, beta
+        visited_nodes = 1
+        ply = 0
+        while True:
+            child = next_child[ply]
+            if child < moves:
+                next_child[ply] = child + 1
+                new_number = numbers[ply] * multipliers[child]
+                points = -1 if new_number % 2 == 0 else 1
+                new_bank = banks[ply] + 1 if new_number % 10 == 0 or new_number % 10 == 5 else banks[ply]
+                if ply % 2 == 0:
+                    new_ai, new_player = ais[ply] + points, players[ply]
+                else:
+                    new_ai, new_player = ais[ply], players[ply] + points
+                visited_nodes += 1
+                if detailed:
+                    stats.record_node(ply + 1)
+                if new_number < target and ply + 1 < depth:
+                    ply += 1
+                    numbers[ply], ais[ply], players[ply], banks[ply] = new_number, new_ai, new_player, new_bank
+                    next_child[ply], best_moves[ply] = 0, None
+                    best_scores[ply] = -inf if ply % 2 == 0 else inf
+                    alphas[ply], betas[ply] = alphas[ply - 1], betas[ply - 1]
+                    continue
+                score = evaluate(new_number, new_ai, new_player, new_bank, True, rules)
+                if detailed:
+                    stats.leaf_evaluations += 1
+            else:
+                # every child of this ply is done, hand its value to the parent
+                score = best_scores[ply]
+                if ply == 0:
+                    stats.nodes += visited_nodes
+                    return score, best_moves[0], stats
+                ply -= 1
+
+            multiplier = multipliers[next_child[ply] - 1]
+            if ply % 2 == 0:
+                if score > best_scores[ply]:
+                    best_scores[ply] = score
+                    best_moves[ply] = multiplier
+                if prune:
+                    alphas[ply] = max(alphas[ply], score)
+                    if betas[ply] <= alphas[ply]:
+                        next_child[ply] = moves
+                        if detailed:
+                            stats.record_cutoff(ply)
+            else:
+                if score < best_scores[ply]:
+                    best_scores[ply] = score
+                    best_moves[ply] = multiplier
+                if prune:
+                    betas[ply] = min(betas[ply], score)
+                    if betas[ply] <= alphas[ply]:
+                        next_child[ply] = moves
+                        if detailed:
+                            stats.record_cutoff(ply)
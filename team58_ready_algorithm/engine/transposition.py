@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+# Entry flags: the stored score is exact, a lower bound (fail high) or an upper bound (fail low)
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+#Bounded transposition table shared by minimax and alphabeta.
+#x2*x3 and x3*x2 reach the same number, but not always with the same points (25 -> 50 -> 150
+#and 25 -> 75 -> 150 score differently), so the key is the number together with the point
+#difference, bank and side to move: everything evaluate() and the rest of the game depend on.
+class TranspositionTable:
+    def __init__(self, max_size=100000):
+        self.max_size = max_size # maximum number of stored positions
+        self.entries = OrderedDict() # key -> (depth, flag, score, move), oldest first
+        self.hits = 0 # probes that found the position
+        self.cutoffs = 0 # hits that answered the node without searching it
+        self.stores = 0
+        self.evictions = 0
+
+    #Canonical state: only the point difference matters to evaluate(), not the two totals.
+    @staticmethod
+    def make_key(node, is_maximizing):
+        return (node.current_number, node.ai_points - node.player_points, node.game_bank, is_maximizing)
+
+    #Returns (score, move). score is None when the entry can't be used for this window,
+    #move is still returned so it can be tried first.
+    def probe(self, key, depth, alpha=float('-inf'), beta=float('inf')):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None, None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        entry_depth, flag, score, move = entry
+        if entry_depth >= depth:
+            if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                self.cutoffs += 1
+                return score, move
+        return None, move
+
+    #Depth-preferred replacement for the same position, least recently used eviction when full.
+    def store(self, key, depth, flag, score, move):
+        old = self.entries.get(key)
+        if old is not None and old[0] > depth:
+            return
+        self.entries[key] = (depth, flag, score, move)
+        self.entries.move_to_end(key)
+        self.stores += 1
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    #Classifies a fail-soft alphabeta result against the window it was searched with.
+    def store_bound(self, key, depth, score, move, alpha_orig, beta_orig):
+        if score <= alpha_orig:
+            flag = UPPER
+        elif score >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.store(key, depth, flag, score, move)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.cutoffs = self.stores = self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
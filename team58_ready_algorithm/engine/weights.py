@@ -0,0 +1,27 @@
+import json
+import os
+
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "weights.json") # written by tune_weights.py
+DEFAULT_WEIGHTS = (1, 1, 0.0001) # A, B, C of evaluate() in engine/core.py
+
+
+#(A, B, C) of evaluate(): A * (ai_points - player_points) + B * game_bank - C * distance to the target.
+#The tuned weights in path if it exists, else default, so without a config every engine keeps its own.
+def load_weights(default=DEFAULT_WEIGHTS, path=WEIGHTS_FILE):
+    if not os.path.exists(path):
+        return tuple(default)
+    with open(path) as f:
+        config = json.load(f)
+    weights = config["weights"]
+    return weights["A"], weights["B"], weights["C"]
+
+
+#info (score, games, depth...) is stored next to the weights so the config says where it came from
+def save_weights(weights, path=WEIGHTS_FILE, info=None):
+    A, B, C = weights
+    config = {"weights": {"A": A, "B": B, "C": C}}
+    if info:
+        config.update(info)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import RULES, Node, Rules, StackSearch, alphabeta, evaluate, get_weights, parse_target, solve_state, stack_search
+from engine.batched_search import batched_minimax
+from engine.mcts import MCTS
+from engine.position_cache import open_cache
+
+HOST = "127.0.0.1"
+PORT = 5858
+ENGINES = ("minimax", "alphabeta", "solved", "mcts")
+DEFAULT_DEPTH = 5 # depth of minimax/alphabeta, playouts / 16 of mcts when a request has none
+MAX_DEPTH = 12
+BATCH_SIZE = 512 # positions sent to a worker at once
+CACHE_SIZE = 200000 # searched positions kept by the service
+
+
+#Searches a batch of (number, ai_points, player_points, game_bank) positions, all with the same
+#engine and depth, in a pool worker. minimax runs the whole batch as one batched_minimax().
+#With position_cache (a file) alphabeta uses the persistent PositionCache as its TT.
+#Returns [(score, move, nodes)] in batch order.
+def search_batch(engine, depth, states, rules=RULES, position_cache=None):
+    if engine == "minimax":
+        numbers, ai_points, player_points, banks = zip(*states)
+        scores, moves, stats = batched_minimax(numbers, ai_points, player_points, banks, depth, get_weights(), rules=rules)
+        nodes = stats.nodes // len(states)
+        return [(float(score), int(move), nodes) for score, move in zip(scores, moves)]
+    results = []
+    if engine == "alphabeta" and position_cache:
+        cache = open_cache(position_cache, rules, get_weights())
+        for state in states:
+            score, move, stats = alphabeta(Node(*state, 0, True), depth, float('-inf'), float('inf'), True, tt=cache, rules=rules)
+            results.append((score, move, stats.nodes))
+        cache.flush()
+        return results
+    core = stack_search if rules == RULES else StackSearch(evaluate, rules=rules)
+    for number, ai_points, player_points, game_bank in states:
+        if engine == "alphabeta":
+            score, move, stats = core.alphabeta(number, ai_points, player_points, game_bank, depth)
+            results.append((score, move, stats.nodes))
+        elif engine == "solved":
+            value, move = solve_state(number, game_bank, rules)
+            results.append((float(value), move, 0))
+        else:
+            score, move, stats = MCTS(seed=0, rules=rules).search(number, ai_points, player_points, game_bank, depth * 16)
+            results.append((score, move, stats.nodes))
+    return results
+
+
+#"Best move for this state" over JSON lines. A request is
+#  {"id": 1, "number": 50, "ai_points": 0, "player_points": 1, "bank": 0, "engine": "alphabeta", "depth": 5}
+#(id is echoed back, engine and depth are optional) and is answered on the same connection with
+#  {"id": 1, "move": 3, "score": 1.5, "nodes": 40, "cached": false}
+#or {"id": 1, "error": "..."}; answers can come out of order. {"stats": true} returns the counters.
+#Scores of positions where the target is reached are Infinity, as Python's json writes them.
+#Searches never run on the event loop: requests wait in a queue while every worker is busy and a
+#worker that frees up takes all of them at once, so batches grow with the load. Positions already
+#searched come from an LRU cache, and a position asked for again while it is being searched
+#waits for that search instead of starting another.
+class EngineService:
+    def __init__(self, workers=0, batch_size=BATCH_SIZE, cache_size=CACHE_SIZE, rules=RULES, position_cache=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.rules = rules
+        self.position_cache = position_cache
+        self.executor = ProcessPoolExecutor(self.workers)
+        self.cache = OrderedDict() # key -> (score, move, nodes)
+        self.pending = {} # key -> futures of the requests waiting for its search
+        self.queue = None
+        self.free_workers = None
+        self.tasks = set()
+        self.requests = 0
+        self.cache_hits = 0
+        self.joined = 0 # requests that waited for a search already running
+        self.batches = 0
+        self.searched = 0
+
+    def make_key(self, request):
+        engine = request.get("engine", "alphabeta")
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine: {engine}")
+        depth = int(request.get("depth", DEFAULT_DEPTH))
+        if not 1 <= depth <= MAX_DEPTH: # depth 0 searches no move
+            raise ValueError(f"depth must be 1-{MAX_DEPTH}")
+        number = int(request["number"])
+        if not 1 <= number < self.rules.target:
+            raise ValueError(f"number must be 1-{self.rules.target - 1}")
+        ai_points, player_points, bank = int(request.get("ai_points", 0)), int(request.get("player_points", 0)), int(request.get("bank", 0))
+        if engine == "solved": # perfect play doesn't depend on the points or a depth
+            return engine, 0, number, 0, 0, bank
+        # evaluate() (and who wins a playout) only sees the point difference, so the position
+        # is searched as ai_points = difference, player_points = 0; key[2:] is the searched state
+        return engine, depth, number, ai_points - player_points, 0, bank
+
+    async def best_move(self, request):
+        key = self.make_key(request)
+        self.requests += 1
+        result = self.cache.get(key)
+        if result is not None:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return result, True
+        future = asyncio.get_running_loop().create_future()
+        if key in self.pending:
+            self.joined += 1
+            self.pending[key].append(future)
+        else:
+            self.pending[key] = [future]
+            self.queue.put_nowait(key)
+        return await future, False
+
+    async def batcher(self):
+        while True:
+            key = await self.queue.get()
+            await self.free_workers.acquire()
+            batch = [key]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            task = asyncio.create_task(self.run_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            groups = {}
+            for key in batch:
+                groups.setdefault(key[:2], []).append(key)
+            jobs = [loop.run_in_executor(self.executor, search_batch, engine, depth, [key[2:] for key in keys], self.rules, self.position_cache)
+                    for (engine, depth), keys in groups.items()]
+            self.batches += 1
+            self.searched += len(batch)
+            for keys, results in zip(groups.values(), await asyncio.gather(*jobs)):
+                for key, result in zip(keys, results):
+                    self.store(key, result)
+                    for future in self.pending.pop(key):
+                        if not future.done():
+                            future.set_result(result)
+        except Exception as error:
+            for key in batch:
+                for future in self.pending.pop(key, []):
+                    if not future.done():
+                        future.set_exception(error)
+        finally:
+            self.free_workers.release()
+
+    def store(self, key, result):
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def stats(self):
+        return {"requests": self.requests, "cache_hits": self.cache_hits, "joined": self.joined, "batches": self.batches,
+                "searched": self.searched, "average_batch": self.searched / self.batches if self.batches else 0.0,
+                "cached_positions": len(self.cache), "workers": self.workers}
+
+    async def answer(self, request, writer):
+        try:
+            (score, move, nodes), cached = await self.best_move(request)
+            response = {"id": request.get("id"), "move": move, "score": score, "nodes": nodes, "cached": cached}
+        except (KeyError, ValueError, TypeError) as error:
+            response = {"id": request.get("id"), "error": f"bad request: {error}"}
+        except Exception as error:
+            response = {"id": request.get("id"), "error": f"search failed: {error}"}
+        writer.write((json.dumps(response) + "\n").encode())
+
+    #One coroutine per connection; every request gets its own task so a slow search doesn't hold
+    #up the ones behind it on the same connection
+    async def handle(self, reader, writer):
+        answers = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("not an object")
+                except ValueError as error:
+                    writer.write((json.dumps({"id": None, "error": f"bad request: {error}"}) + "\n").encode())
+                    continue
+                if request.get("stats"):
+                    writer.write((json.dumps({"id": request.get("id"), "stats": self.stats()}) + "\n").encode())
+                    continue
+                task = asyncio.create_task(self.answer(request, writer))
+                answers.add(task)
+                task.add_done_callback(answers.discard)
+                await writer.drain()
+            if answers:
+                await asyncio.gather(*answers)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for task in answers:
+                task.cancel()
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, unix_path=None, ready=None):
+        self.queue = asyncio.Queue()
+        self.free_workers = asyncio.Semaphore(self.workers)
+        batcher = asyncio.create_task(self.batcher())
+        # start the workers (imports, solver) before the first request
+        await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(self.executor, search_batch, "solved", 0, [(self.rules.start_low, 0, 0, 0)], self.rules)
+                               for _ in range(self.workers)))
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, unix_path)
+            where = unix_path
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            where = f"{host}:{server.sockets[0].getsockname()[1]}"
+        print(f"Engine service on {where} with {self.workers} workers")
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self.executor.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless engine service: best moves over JSON lines")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=0, help="search processes, 0 uses every core")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="most positions sent to a worker at once")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="searched positions kept in memory")
+    parser.add_argument("--position-cache", metavar="PATH", help="persistent PositionCache file for alphabeta")
+    parser.add_argument("--target", default=str(RULES.target), help="number to reach (5000, 1e9)")
+    args = parser.parse_args(argv)
+
+    rules = Rules(parse_target(args.target), RULES.multipliers, RULES.start_low, RULES.start_high)
+    service = EngineService(args.workers, args.batch, args.cache_size, rules, args.position_cache)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+
+import pygame
+
+FRAME_RATE = 30 # frames per second every screen is capped at
+TEXT_CACHE_SIZE = 256 # rendered text surfaces kept before the least recently used is dropped
+
+
+#Frame limiting, dirty checking and cached text surfaces shared by all screens.
+#A screen loop describes what it would draw as a small state tuple (screen name, mouse
+#position, texts...). dirty(state) is only True when that state changed since the last
+#drawn frame, so an idle menu costs an event poll and a tuple compare per frame.
+class Renderer:
+    def __init__(self, font, fps=FRAME_RATE, cache_size=TEXT_CACHE_SIZE):
+        self.font = font
+        self.fps = fps
+        self.cache_size = cache_size
+        self.clock = pygame.time.Clock()
+        self.surfaces = OrderedDict() # (text, color) -> rendered surface, oldest first
+        self.last_state = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+
+    #font.render() with an LRU cache. Lines that change every frame (timers, node counts)
+    #pass cache=False so they don't push the button labels and log lines out.
+    def text(self, text, color, cache=True):
+        if not cache:
+            return self.font.render(text, True, color)
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.cache_size:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def dirty(self, state):
+        if state == self.last_state:
+            self.frames_skipped += 1
+            return False
+        self.last_state = state
+        self.frames_drawn += 1
+        return True
+
+    #Forces the next frame to be drawn (window exposed, another screen drew over this one)
+    def invalidate(self):
+        self.last_state = None
+
+    #Call for every event of the screen loop, redraws when the window needs repainting
+    def handle_event(self, event):
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.invalidate()
+
+    #Waits out the rest of the frame
+    def tick(self):
+        self.clock.tick(self.fps)
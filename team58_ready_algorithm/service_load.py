@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from benchmark import percentile
+from engine_service import DEFAULT_DEPTH, HOST, PORT
+from engine import RULES, Rules, parse_target
+
+
+#One game against the service, same rules and RNG use as play_game(): the seeded random player
+#moves first and every AI move is a request. Appends the latency of every request in ms.
+async def play_service_game(reader, writer, engine, depth, seed, latencies, rules=RULES):
+    rng = random.Random(seed)
+    current_number = rules.random_start(rng)
+    ai_points = player_points = game_bank = 0
+    is_player_turn = True
+    while current_number < rules.target:
+        if is_player_turn:
+            multiplier = rules.random_move(rng)
+        else:
+            request = {"id": seed, "number": current_number, "ai_points": ai_points, "player_points": player_points,
+                       "bank": game_bank, "engine": engine, "depth": depth}
+            start_time = time.perf_counter()
+            writer.write((json.dumps(request) + "\n").encode())
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            if "error" in response:
+                raise RuntimeError(response["error"])
+            multiplier = response["move"]
+        current_number, ai_points, player_points, game_bank, ai_to_move = rules.apply(
+            (current_number, ai_points, player_points, game_bank, not is_player_turn), multiplier)
+        is_player_turn = not ai_to_move
+    return ai_points > player_points
+
+
+async def open_connection(host, port, unix_path):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+#concurrency simulated clients, each on its own connection, play games one after another
+#until games have been played. Game i uses seed + i.
+async def run_load(games, concurrency, engine, depth, seed, host=HOST, port=PORT, unix_path=None, rules=RULES):
+    latencies = []
+    next_game = 0
+    ai_wins = 0
+
+    async def client():
+        nonlocal next_game, ai_wins
+        reader, writer = await open_connection(host, port, unix_path)
+        try:
+            while next_game < games:
+                game = next_game
+                next_game += 1
+                won = await play_service_game(reader, writer, engine, depth, seed + game, latencies, rules)
+                ai_wins += won # not "+= await": that would add to a count read before other clients updated it
+        finally:
+            writer.close()
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(min(concurrency, games))))
+    elapsed = time.perf_counter() - start_time
+
+    reader, writer = await open_connection(host, port, unix_path)
+    writer.write(b'{"stats": true}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())["stats"]
+    writer.close()
+    return ai_wins, latencies, elapsed, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for engine_service.py")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", metavar="PATH", help="connect to a unix socket instead of TCP")
+    parser.add_argument("--games", type=int, default=2000, help="games to play")
+    parser.add_argument("--concurrency", type=int, default=100, help="games played at the same time")
+    parser.add_argument("--engine", default="alphabeta", help="minimax, alphabeta, solved or mcts")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--seed", type=int, default=0, help="game i is played with seed + i")
+    parser.add_argument("--target", default=str(RULES.target), help="must match the service")
+    args = parser.parse_args(argv)
+
+    rules = Rules(parse_target(args.target), RULES.multipliers, RULES.start_low, RULES.start_high)
+    ai_wins, latencies, elapsed, stats = asyncio.run(run_load(args.games, args.concurrency, args.engine, args.depth, args.seed,
+                                                              args.host, args.port, args.unix, rules))
+    latencies.sort()
+    print(f"{args.engine} depth {args.depth}: {args.games} games, {args.concurrency} concurrent, AI wins {ai_wins}/{args.games}")
+    print(f"{len(latencies)} requests in {elapsed:.2f} s: {len(latencies) / elapsed:,.0f} requests/s")
+    print(f"latency p50 {percentile(latencies, 50):.3f} p95 {percentile(latencies, 95):.3f} "
+          f"p99 {percentile(latencies, 99):.3f} max {latencies[-1] if latencies else 0:.3f} ms")
+    print(f"service: {stats['requests']} requests, {stats['cache_hits']} cache hits, {stats['joined']} joined a running search, "
+          f"{stats['batches']} batches of {stats['average_batch']:.1f} on {stats['workers']} workers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,12 +2,13 @@ import pygame
 import sys
 import random
 import time
-
-pygame.init()
+from ai_worker import AIWorker, Ponderer
+from engine import (RULES, MoveOrdering, Node, SearchStats, TranspositionTable, alphabeta, evaluate, get_table,
+                    iterative_deepening, minimax, solved_move, update_points_and_bank)
+from engine.game_record import GameRecord, RecordWriter
+from rendering import Renderer
 
 screen_width, screen_height = 850, 900
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption('Game with Alpha-Beta Pruning')
 
 # Define colors
 BACKGROUND_COLOR = (41, 47, 54)
@@ -15,23 +16,42 @@ BUTTON_COLOR = (255, 87, 34)
 BUTTON_HOVER_COLOR = (255, 138, 101)
 TEXT_COLOR = (255, 255, 255)
 SHADOW_COLOR = (0, 0, 0, 100)
-font = pygame.font.Font(None, 36)
-
-
-
-#Draws a button with text on the screen and detects clicks
-def draw_button(text, position, active_color, inactive_color, screen):
+AI_TIME_BUDGET_MS = 5 # per-move budget for the iterative-deepening alpha-beta AI
+AI_MINIMAX_DEPTH = 2
+AI_MCTS_PLAYOUTS = 2000 # per move, a few ms
+PONDERING = True # search the AI's replies while the player is choosing
+RECORD_GAMES = True # append every finished game to engine.game_record.RECORDS_PATH
+screen = None # the window, font and renderer are made by init_display() so importing this file opens nothing
+font = None
+renderer = None # frame cap, dirty checks and the text surface cache of every screen
+
+
+#Opens the game window
+def init_display():
+    global screen, font, renderer
+    pygame.init()
+    screen = pygame.display.set_mode((screen_width, screen_height))
+    pygame.display.set_caption('Game with Alpha-Beta Pruning')
+    font = pygame.font.Font(None, 36)
+    renderer = Renderer(font)
+
+
+
+#Draws a button with text on the screen and detects clicks.
+#With draw=False (nothing changed since the last frame) only the click is checked.
+def draw_button(text, position, active_color, inactive_color, screen, draw=True):
     mouse = pygame.mouse.get_pos()
     click = pygame.mouse.get_pressed()
 
     button_rect = pygame.Rect(position[0], position[1], 200, 80)
-    shadow_rect = button_rect.move(6, 6)
-    pygame.draw.rect(screen, SHADOW_COLOR, shadow_rect)
-    pygame.draw.rect(screen, inactive_color if button_rect.collidepoint(mouse) else active_color, button_rect, border_radius=10)  # Main body of button with rounded corners
+    if draw:
+        shadow_rect = button_rect.move(6, 6)
+        pygame.draw.rect(screen, SHADOW_COLOR, shadow_rect)
+        pygame.draw.rect(screen, inactive_color if button_rect.collidepoint(mouse) else active_color, button_rect, border_radius=10)  # Main body of button with rounded corners
 
-    text_surf = font.render(text, True, TEXT_COLOR)
-    text_rect = text_surf.get_rect(center=button_rect.center)
-    screen.blit(text_surf, text_rect)
+        text_surf = renderer.text(text, TEXT_COLOR)
+        text_rect = text_surf.get_rect(center=button_rect.center)
+        screen.blit(text_surf, text_rect)
 
     return button_rect.collidepoint(mouse) and click[0] == 1
 
@@ -42,16 +62,25 @@ def main_menu():
     chosen_algorithm = None
     running = True
     while running:
-        screen.fill(BACKGROUND_COLOR)
-        start_button_clicked = draw_button('START', (screen_width // 2 - 100, 100), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen)
-        quit_button_clicked = draw_button('EXIT', (screen_width // 2 - 100, 200), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen)
-
-        if draw_button('Minimax', (screen_width // 2 - 100, 300), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen):
+        redraw = renderer.dirty(("main_menu", pygame.mouse.get_pos()))
+        if redraw:
+            screen.fill(BACKGROUND_COLOR)
+        start_button_clicked = draw_button('START', (screen_width // 2 - 100, 100), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen, redraw)
+        quit_button_clicked = draw_button('EXIT', (screen_width // 2 - 100, 200), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen, redraw)
+
+        # every button is drawn, the first clicked one wins
+        clicked = [draw_button(label, (screen_width // 2 - 100, y), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen, redraw)
+                   for label, y in (('Minimax', 300), ('Alpha-Beta', 400), ('Random', 500), ('Solved', 600), ('MCTS', 700))]
+        if clicked[0]:
             chosen_algorithm = "minimax"
-        elif draw_button('Alpha-Beta', (screen_width // 2 - 100, 400), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen):
+        elif clicked[1]:
             chosen_algorithm = "alphabeta"
-        elif draw_button('Random', (screen_width // 2 - 100, 500), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen):
+        elif clicked[2]:
             chosen_algorithm = "random"
+        elif clicked[3]:
+            chosen_algorithm = "solved"
+        elif clicked[4]:
+            chosen_algorithm = "mcts"
 
         if start_button_clicked and chosen_algorithm is not None:
             start_number = start_menu()
@@ -63,10 +92,13 @@ def main_menu():
             sys.exit()
 
         for event in pygame.event.get():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 running = False
 
-        pygame.display.flip()
+        if redraw:
+            pygame.display.flip()
+        renderer.tick()
 
 
 
@@ -75,11 +107,14 @@ def start_menu():
     input_number = ''
     running = True
     while running:
-        screen.fill(BACKGROUND_COLOR)
-        title_text = font.render('Choose a starting number (25 to 40): ' + input_number, True, TEXT_COLOR)
-        screen.blit(title_text, (screen_width // 2 - 250, 300))
+        redraw = renderer.dirty(("start_menu", input_number))
+        if redraw:
+            screen.fill(BACKGROUND_COLOR)
+            title_text = renderer.text(f'Choose a starting number ({RULES.start_low} to {RULES.start_high}): ' + input_number, TEXT_COLOR)
+            screen.blit(title_text, (screen_width // 2 - 250, 300))
 
         for event in pygame.event.get():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -87,57 +122,49 @@ def start_menu():
                 if event.key == pygame.K_BACKSPACE:
                     input_number = input_number[:-1]
                 elif event.key == pygame.K_RETURN:
-                    if 25 <= int(input_number) <= 40:
+                    if RULES.start_low <= int(input_number) <= RULES.start_high:
                         return int(input_number)
                     else:
                         input_number = ''
                 else:
-                    if event.unicode.isdigit() and len(input_number) < 2:
+                    if event.unicode.isdigit() and len(input_number) < len(str(RULES.start_high)):
                         input_number += event.unicode
 
-        pygame.display.flip()
-
-#Calculates points and updates the bank based on the current number.
-def update_points_and_bank(number):
-    points = 0
-    bank = 0
-    if number % 2 == 0:
-        points -= 1
-    else:
-        points += 1
-    
-    if number % 10 == 0 or number % 10 == 5:
-        bank += 1
-    
-    return points, bank
+        if redraw:
+            pygame.display.flip()
+        renderer.tick()
 
 #Displays the end game screen showing final scores
 def display_end_game_screen(player_points, ai_points, game_bank, log_messages):
-    screen.fill(BACKGROUND_COLOR)
     result_text = f"Player points: {player_points}, AI points: {ai_points}, Bank: {game_bank}"
-    result_msg = font.render(result_text, True, TEXT_COLOR)
-    screen.blit(result_msg, (screen_width // 2 - result_msg.get_width() // 2, 20))
-
-    log_start_y = 60
-    for i, log_message in enumerate(log_messages[-15:], start=1):
-        log_text = font.render(log_message, True, TEXT_COLOR)
-        screen.blit(log_text, (50, log_start_y + i * 20))
-
-    pygame.display.flip()
 
     waiting = True
     while waiting:
+        redraw = renderer.dirty(("end_game", pygame.mouse.get_pos(), result_text))
+        if redraw:
+            screen.fill(BACKGROUND_COLOR)
+            result_msg = renderer.text(result_text, TEXT_COLOR)
+            screen.blit(result_msg, (screen_width // 2 - result_msg.get_width() // 2, 20))
+
+            log_start_y = 60
+            for i, log_message in enumerate(log_messages[-15:], start=1):
+                log_text = renderer.text(log_message, TEXT_COLOR)
+                screen.blit(log_text, (50, log_start_y + i * 20))
+
         for event in pygame.event.get():
+            renderer.handle_event(event)
             if event.type == pygame.QUIT:
                 waiting = False
                 pygame.quit()
                 sys.exit()
 
-        restart_button_clicked = draw_button('RESTART', (screen_width // 2 - 100, 800), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen)
+        restart_button_clicked = draw_button('RESTART', (screen_width // 2 - 100, 800), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen, redraw)
         if restart_button_clicked:
             waiting = False
 
-        pygame.display.flip()
+        if redraw:
+            pygame.display.flip()
+        renderer.tick()
 
     main_menu()
 
@@ -145,115 +172,79 @@ def display_end_game_screen(player_points, ai_points, game_bank, log_messages):
 
 
 
-class Node: #dinamiska atmina
-    def __init__(self, current_number, ai_points, player_points, game_bank, depth, is_maximizing, multiplier=None,is_ai_turn=True):
-        self.current_number = current_number #The current number in the game state
-        self.ai_points = ai_points #The AI's points.
-        self.player_points = player_points #The player's points. 
-        self.game_bank = game_bank # Bank points
-        self.depth = depth #depth of this node in the game tree
-        self.is_maximizing = is_maximizing #goal at this node is to maximize points (AI's turn) or minimize (player's turn).
-        self.multiplier = multiplier #multiplier, used to modify calculations in the game logic.
-        self.children = [] # children list
-        self.is_ai_turn = is_ai_turn # Indicates if it's currently the AI's turn at this game state.
-    def add_child(self, child):
-        self.children.append(child) #add a child Node to the children list, forming parent-child relationships in the tree structure.
-
-
-
-#Evaluates the current state of the game for AI.                    
-def evaluate(current_number, ai_points, player_points, game_bank,  is_ai_turn):
-    A = 1
-    B = 1
-    C = 0.001
-    base_score = A * (ai_points - player_points) + B * game_bank - C * abs(5000 - current_number)
-
-    if current_number >= 5000:
-        return float('inf') if is_ai_turn else float('-inf')
-    else:
-        return base_score
-
-
-
-
-# minimax algorithm    
-def minimax(node, depth, is_maximizing, visited_nodes=0):
-    visited_nodes += 1
-    if node.current_number >= 5000 or depth == 0:
-        score = evaluate(node.current_number, node.ai_points, node.player_points, node.game_bank,  node.is_ai_turn)
-
-        #print(f"Minimax: Depth {depth}, Score: {score}, Maximizing: {is_maximizing}")
-        return score, None, visited_nodes
-    
-    if is_maximizing:
-        best_score = float('-inf')
-        best_move = None
-        for multiplier in [2, 3, 4]:
-            new_number = node.current_number * multiplier
-            points, bank = update_points_and_bank(new_number)
-            new_node = Node(new_number, node.ai_points + points, node.player_points, node.game_bank + bank, node.depth + 1, False, multiplier)
-            #print(f"Minimax: Creating node at depth {new_node.depth} with current_number {new_node.current_number}, ai_points {new_node.ai_points}, player_points {new_node.player_points}, game_bank {new_node.game_bank}, is_maximizing {new_node.is_maximizing}, multiplier {new_node.multiplier}")
-            score, _, visited_nodes = minimax(new_node, depth-1, False, visited_nodes)
-            if score > best_score:
-                best_score = score
-                best_move = multiplier
-        #print(f"Minimax: Depth {depth}, Best Score: {best_score}, Best Move: {best_move}, Maximizing: {is_maximizing}")
-        return best_score, best_move, visited_nodes
-    else:
-        best_score = float('inf')
-        best_move = None
-        for multiplier in [2, 3, 4]:
-            new_number = node.current_number * multiplier
-            points, bank = update_points_and_bank(new_number)
-            new_node = Node(new_number, node.ai_points, node.player_points + points, node.game_bank + bank, node.depth + 1, True, multiplier)
-            score, _, visited_nodes = minimax(new_node, depth-1, True, visited_nodes) 
-            if score < best_score:
-                best_score = score
-                best_move = multiplier
-        #print(f"Minimax: Depth {depth}, Best Score: {best_score}, Best Move: {best_move}, Maximizing: {is_maximizing}")
-        return best_score, best_move, visited_nodes
-    
-
-
-
-# alphabeta algorithm 
-def alphabeta(node, depth, alpha, beta, is_maximizing,visited_nodes=0):
-    visited_nodes += 1
-    if node.current_number >= 5000 or depth == 0:
-        score = evaluate(node.current_number, node.ai_points, node.player_points, node.game_bank, node.is_ai_turn)
-        return score, None, visited_nodes
-    if is_maximizing:
-        best_score = float('-inf')
-        best_move = None
-        for multiplier in [2, 3, 4]:
-            new_number = node.current_number * multiplier
-            points, bank = update_points_and_bank(new_number)
-            new_node = Node(new_number, node.ai_points + points, node.player_points, node.game_bank + bank, node.depth + 1, False, multiplier)
-            #print(f"AlphaBeta: Creating node at depth {new_node.depth} with current_number {new_node.current_number}, ai_points {new_node.ai_points}, player_points {new_node.player_points}, game_bank {new_node.game_bank}, is_maximizing {new_node.is_maximizing}, multiplier {new_node.multiplier}")
-            score, _, visited_nodes = alphabeta(new_node, depth-1, alpha, beta, False, visited_nodes)
-            if score > best_score:
-                best_score = score
-                best_move = multiplier
-            alpha = max(alpha, score)
-            if beta <= alpha:
-                break
-        return best_score, best_move, visited_nodes
+#search(deadline, stats) -> multiplier for the AI worker threads, tree is the game's MCTS,
+#time_budget_ms bounds the alpha-beta AI's iterative deepening
+def make_ai_search(algorithm, node, tt, ordering, tree=None, time_budget_ms=AI_TIME_BUDGET_MS):
+    if algorithm == "minimax":
+        def search(deadline, stats):
+            stats.depth = AI_MINIMAX_DEPTH
+            return minimax(node, AI_MINIMAX_DEPTH, True, stats, tt, deadline)[1]
+    elif algorithm == "alphabeta":
+        def search(deadline, stats):
+            return iterative_deepening(alphabeta, node, time_budget_ms, tt=tt, ordering=ordering, stats=stats, deadline=deadline)[1]
+    elif algorithm == "random":
+        def search(deadline, stats):
+            return random.choice(RULES.multipliers)
+    elif algorithm == "mcts":
+        def search(deadline, stats):
+            return tree.search(node.current_number, node.ai_points, node.player_points, node.game_bank, AI_MCTS_PLAYOUTS, stats=stats, deadline=deadline)[1]
     else:
-        best_score = float('inf')
-        best_move = None
-        for multiplier in [2, 3, 4]:
-            new_number = node.current_number * multiplier
-            points, bank = update_points_and_bank(new_number)
-            new_node = Node(new_number, node.ai_points, node.player_points + points, node.game_bank + bank, node.depth + 1, True, multiplier)
-            score, _, visited_nodes = alphabeta(new_node, depth-1, alpha, beta, True, visited_nodes)
-            if score < best_score:
-                best_score = score
-                best_move = multiplier
-            beta = min(beta, score)
-            if beta <= alpha:
-                break
-        return best_score, best_move, visited_nodes
-
+        def search(deadline, stats):
+            return solved_move(get_table(), node.current_number, node.game_bank) # the table is loaded once per process
+    return search
+
+
+#Starts pondering the AI's reply to each player move that doesn't end the game. The searches
+#have no time budget: they deepen until the player moves and Ponderer.stop() forces them.
+def start_pondering(algorithm, current_number, ai_points, player_points, game_bank, tt, ordering):
+    searches = {}
+    for multiplier in RULES.multipliers:
+        new_number = current_number * multiplier
+        if new_number >= RULES.target:
+            continue
+        points, bank = update_points_and_bank(new_number)
+        node = Node(new_number, ai_points, player_points + points, game_bank + bank, 0, True)
+        searches[multiplier] = make_ai_search(algorithm, node, tt, ordering, time_budget_ms=float('inf'))
+    return Ponderer(searches)
+
+
+#Keeps the window responsive while the AI worker searches: redraws the board with a
+#"thinking..." line and the live node count. SPACE or 'Move now' forces the move,
+#ESC cancels the search and returns to the menu.
+def wait_for_ai(worker, info_text, log_messages):
+    start_time = time.perf_counter()
+    while not worker.done:
+        for event in pygame.event.get():
+            renderer.handle_event(event)
+            if event.type == pygame.QUIT:
+                worker.cancel()
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                worker.force()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                worker.cancel()
+                return None
+
+        elapsed = time.perf_counter() - start_time
+        thinking = f"AI thinking... {worker.stats.nodes} nodes, {elapsed:.1f} s (SPACE: move now, ESC: cancel)"
+        redraw = renderer.dirty(("thinking", pygame.mouse.get_pos(), thinking))
+        if redraw:
+            screen.fill(BACKGROUND_COLOR)
+            screen.blit(info_text, (50, 50))
+            log_y_start = 500
+            for message in log_messages[-5:]:
+                log_text = renderer.text(message, TEXT_COLOR)
+                screen.blit(log_text, (50, log_y_start))
+                log_y_start += 30
+            thinking_text = renderer.text(thinking, TEXT_COLOR, cache=False) # changes every frame
+            screen.blit(thinking_text, (50, 150))
+        if draw_button('Move now', (screen_width // 2 - 100, 800), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen, redraw):
+            worker.force()
+        if redraw:
+            pygame.display.flip()
+        renderer.tick()
+    return worker.result()
 
     
 #game field
@@ -263,41 +254,50 @@ def game_loop(start_number,algorithm):
     ai_points = 0
     game_bank = 0
     is_player_turn = True
-    algorithm_name = "Minimax" if algorithm == "minimax" else "Alpha-Beta" if algorithm == "alphabeta" else "Random"
+    algorithm_name = "Minimax" if algorithm == "minimax" else "Alpha-Beta" if algorithm == "alphabeta" else "Solved" if algorithm == "solved" else "MCTS" if algorithm == "mcts" else "Random"
     ai_turn_times = []
     log_messages = []
+    tt = TranspositionTable() # reused across the AI turns of this game
+    ordering = MoveOrdering(evaluate, update_points_and_bank) # history persists across the AI turns
+    tree = None
+    if algorithm == "mcts":
+        from engine.mcts import MCTS # numpy is only loaded when MCTS plays
+        tree = MCTS() # reused across the AI turns
+    game_stats = SearchStats() # all AI turns of this game
+    pondered = None # (move, stats) of the AI reply found while the player was choosing
+    ponder_hits = 0
+    record = GameRecord(start_number)
 
     running = True
     while running:
-        screen.fill(BACKGROUND_COLOR)
-
         # Tekst
-        info_text = font.render(f'Pionts: {current_number} || Player: {player_points} | AI: {ai_points} ({algorithm_name}) || Bank {game_bank}', True, TEXT_COLOR)
-        screen.blit(info_text, (50, 50))
-
-        # log
-        log_y_start = 450
-        for message in log_messages[-5:]:
-            log_text = font.render(message, True, TEXT_COLOR)
-            screen.blit(log_text, (50, log_y_start))
-            log_y_start += 30
+        info = f'Pionts: {current_number} || Player: {player_points} | AI: {ai_points} ({algorithm_name}) || Bank {game_bank}'
+        info_text = renderer.text(info, TEXT_COLOR)
+
         # player turn
-        if is_player_turn and current_number < 5000:  
+        if is_player_turn and current_number < RULES.target:  
+            ordering.new_search() # once per AI turn: the ponder searches and the AI's own search share it
+            ponderer = None
+            if PONDERING and algorithm in ("minimax", "alphabeta"):
+                ponderer = start_pondering(algorithm, current_number, ai_points, player_points, game_bank, tt, ordering)
             
             choice_made = False
             while not choice_made:
-                screen.fill(BACKGROUND_COLOR)  
-                
-                
-                screen.blit(info_text, (50, 50))
-                log_y_start = 500
-                for message in log_messages[-5:]:
-                    log_text = font.render(message, True, TEXT_COLOR)
-                    screen.blit(log_text, (50, log_y_start))
-                    log_y_start += 30
+                redraw = renderer.dirty(("choice", pygame.mouse.get_pos(), info, len(log_messages)))
+                if redraw:
+                    screen.fill(BACKGROUND_COLOR)
+                    screen.blit(info_text, (50, 50))
+                    log_y_start = 500
+                    for message in log_messages[-5:]:
+                        log_text = renderer.text(message, TEXT_COLOR)
+                        screen.blit(log_text, (50, log_y_start))
+                        log_y_start += 30
 
                 for event in pygame.event.get():
+                    renderer.handle_event(event)
                     if event.type == pygame.QUIT:
+                        if ponderer is not None:
+                            ponderer.stop()
                         pygame.quit()
                         sys.exit()
 
@@ -305,42 +305,46 @@ def game_loop(start_number,algorithm):
                 button_y_offset = 0  
                 button_spacing = 100  
                 
-                if draw_button('x2', (350, 150 + button_y_offset), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen):
-                    multiplier = 2
-                    choice_made = True
-                button_y_offset += button_spacing
-
-                if draw_button('x3', (350, 150 + button_y_offset), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen):
-                    multiplier = 3
-                    choice_made = True
-                button_y_offset += button_spacing
-
-                if draw_button('x4', (350, 150 + button_y_offset), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen):
-                    multiplier = 4
-                    choice_made = True
-
-                pygame.display.flip()
-
+                for option in RULES.multipliers:
+                    if draw_button(f'x{option}', (350, 150 + button_y_offset), BUTTON_COLOR, BUTTON_HOVER_COLOR, screen, redraw):
+                        multiplier = option
+                        choice_made = True
+                    button_y_offset += button_spacing
+
+                if redraw:
+                    pygame.display.flip()
+                renderer.tick()
+
+            if ponderer is not None:
+                pondered = ponderer.take(multiplier)
             pygame.time.wait(500)
             new_number = current_number * multiplier
             points, bank = update_points_and_bank(new_number)
             log_messages.append(f"Player x{multiplier}, Result: {new_number} (P: {points}, Bank: {bank})")
+            record.add_move(multiplier, "human")
             current_number = new_number
             player_points += points
             game_bank += bank
             
 
         # AI turn
-        elif not is_player_turn and current_number < 5000:
+        elif not is_player_turn and current_number < RULES.target:
             start_time = time.perf_counter()  # time start
             initial_node = Node(current_number, ai_points, player_points, game_bank, 0, True)
+            turn_stats = SearchStats() # stays empty for random and solved, they don't search
 
-            if algorithm == "minimax":
-                _, multiplier, visited_nodes = minimax(initial_node, 2, True)
-            elif algorithm == "alphabeta":
-                _, multiplier, visited_nodes = alphabeta(initial_node, 2, float('-inf'), float('inf'), True)
-            elif algorithm == "random":
-                multiplier = random.choice([2, 3, 4])
+            if pondered is not None and pondered[0] is not None: # searched while the player was choosing
+                multiplier, turn_stats = pondered
+                ponder_hits += 1
+            else:
+                worker = AIWorker(make_ai_search(algorithm, initial_node, tt, ordering, tree), turn_stats)
+                multiplier = wait_for_ai(worker, info_text, log_messages)
+                if worker.cancelled:
+                    main_menu()
+                    return
+                if multiplier is None: # minimax was forced before it finished, play the 1-ply choice
+                    _, multiplier, _ = minimax(initial_node, 1, True, turn_stats)
+            pondered = None
 
             new_number = current_number * multiplier
             points, bank = update_points_and_bank(new_number)
@@ -351,9 +355,12 @@ def game_loop(start_number,algorithm):
             end_time = time.perf_counter()  # time stop
             ai_turn_time_ms = (end_time - start_time) * 1000  
             ai_turn_times.append(ai_turn_time_ms)  
+            turn_stats.time_ms = ai_turn_time_ms
+            game_stats.merge(turn_stats)
+            record.add_move(multiplier, algorithm, turn_stats.depth, ai_turn_time_ms, turn_stats.nodes)
 
         # check for end
-        if current_number >= 5000:
+        if current_number >= RULES.target:
             if not is_player_turn:
                 ai_points += game_bank
                 log_messages.append(f"Game over: AI reached {current_number}. Bank points ({game_bank}) added to AI.")
@@ -367,7 +374,12 @@ def game_loop(start_number,algorithm):
     avg_turn_time_ms = sum(ai_turn_times) / len(ai_turn_times) if ai_turn_times else 0
     print(f"Average AI turn time: {avg_turn_time_ms:.5f} milliseconds")
 
-    print(f"Visited nodes: {visited_nodes}")
+    print(f"Visited nodes: {game_stats.nodes} ({game_stats.nodes / max(1, game_stats.searches):.1f} per AI turn)")
+    if PONDERING and algorithm in ("minimax", "alphabeta"):
+        print(f"Pondered AI turns: {ponder_hits}/{game_stats.searches}")
+    if RECORD_GAMES:
+        with RecordWriter() as writer:
+            writer.write(record)
     display_end_game_screen(player_points, ai_points, game_bank, log_messages)  
     
 
@@ -375,7 +387,8 @@ def game_loop(start_number,algorithm):
 
 
 def main():
-
+    init_display()
+    get_table() # the "solved" engine's table, loaded before the first game rather than on its first move
     main_menu()
 
 if __name__ == "__main__":
@@ -1,177 +1,272 @@
 import random
 import time
+import os
+import tracemalloc
+from multiprocessing import Pool
+from engine import (PLAYOUTS, RULES, MoveOrdering, Node, SearchStats, StackSearch, TranspositionTable, alphabeta, evaluate, get_table,
+                    get_weights, iterative_deepening, minimax, move_value, pvs, solve, solved_move, stack_search, update_points_and_bank)
+from engine.game_record import GameRecord, RecordWriter
+from engine.position_cache import open_cache
 
-def update_points_and_bank(number):
-    points, bank = 0, 0
-    if number % 2 == 0:
-        points -= 1
-    else:
-        points += 1
-    if number % 10 == 0 or number % 10 == 5:
-        bank += 1
-    return points, bank
-
-class Node:
-    def __init__(self, current_number, ai_points, player_points, game_bank, depth, is_maximizing, multiplier=None,is_ai_turn=True):
-        self.current_number = current_number
-        self.ai_points = ai_points
-        self.player_points = player_points
-        self.game_bank = game_bank
-        self.depth = depth
-        self.is_maximizing = is_maximizing
-        self.multiplier = multiplier
-        self.children = []
-        self.is_ai_turn = is_ai_turn
-    def add_child(self, child):
-        self.children.append(child)
-
-def evaluate(current_number, ai_points, player_points, game_bank,  is_ai_turn):
-    A = 1
-    B = 1
-    C = 0.0001
-    base_score = A * (ai_points - player_points) + B * game_bank - C * abs(5000 - current_number)
-
-    if current_number >= 5000:
-        return float('inf') if is_ai_turn else float('-inf')
-    else:
-        return base_score
-
-# minimax algorithm    
-def minimax(node, depth, is_maximizing, visited_nodes=0):
-    visited_nodes += 1
-    if node.current_number >= 5000 or depth == 0:
-        score = evaluate(node.current_number, node.ai_points, node.player_points, node.game_bank,  node.is_ai_turn)
-
-        #print(f"Minimax: Depth {depth}, Score: {score}, Maximizing: {is_maximizing}")
-        return score, None, visited_nodes
-    
-    if is_maximizing:
-        best_score = float('-inf')
-        best_move = None
-        for multiplier in [2, 3, 4]:
-            new_number = node.current_number * multiplier
-            points, bank = update_points_and_bank(new_number)
-            new_node = Node(new_number, node.ai_points + points, node.player_points, node.game_bank + bank, node.depth + 1, False, multiplier)
-            #print(f"Minimax: Creating node at depth {new_node.depth} with current_number {new_node.current_number}, ai_points {new_node.ai_points}, player_points {new_node.player_points}, game_bank {new_node.game_bank}, is_maximizing {new_node.is_maximizing}, multiplier {new_node.multiplier}")
-            score, _, visited_nodes = minimax(new_node, depth-1, False, visited_nodes)
-            if score > best_score:
-                best_score = score
-                best_move = multiplier
-        #print(f"Minimax: Depth {depth}, Best Score: {best_score}, Best Move: {best_move}, Maximizing: {is_maximizing}")
-        return best_score, best_move, visited_nodes
-    else:
-        best_score = float('inf')
-        best_move = None
-        for multiplier in [2, 3, 4]:
-            new_number = node.current_number * multiplier
-            points, bank = update_points_and_bank(new_number)
-            new_node = Node(new_number, node.ai_points, node.player_points + points, node.game_bank + bank, node.depth + 1, True, multiplier)
-            score, _, visited_nodes = minimax(new_node, depth-1, True, visited_nodes) 
-            if score < best_score:
-                best_score = score
-                best_move = multiplier
-        #print(f"Minimax: Depth {depth}, Best Score: {best_score}, Best Move: {best_move}, Maximizing: {is_maximizing}")
-        return best_score, best_move, visited_nodes
-    
-
-
-
-# alphabeta algorithm 
-def alphabeta(node, depth, alpha, beta, is_maximizing,visited_nodes=0):
-    visited_nodes += 1
-    if node.current_number >= 5000 or depth == 0:
-        score = evaluate(node.current_number, node.ai_points, node.player_points, node.game_bank, node.is_ai_turn)
-        return score, None, visited_nodes
-    if is_maximizing:
-        best_score = float('-inf')
-        best_move = None
-        for multiplier in [2, 3, 4]:
-            new_number = node.current_number * multiplier
-            points, bank = update_points_and_bank(new_number)
-            new_node = Node(new_number, node.ai_points + points, node.player_points, node.game_bank + bank, node.depth + 1, False, multiplier)
-            #print(f"AlphaBeta: Creating node at depth {new_node.depth} with current_number {new_node.current_number}, ai_points {new_node.ai_points}, player_points {new_node.player_points}, game_bank {new_node.game_bank}, is_maximizing {new_node.is_maximizing}, multiplier {new_node.multiplier}")
-            score, _, visited_nodes = alphabeta(new_node, depth-1, alpha, beta, False, visited_nodes)
-            if score > best_score:
-                best_score = score
-                best_move = multiplier
-            alpha = max(alpha, score)
-            if beta <= alpha:
-                break
-        return best_score, best_move, visited_nodes
-    else:
-        best_score = float('inf')
-        best_move = None
-        for multiplier in [2, 3, 4]:
-            new_number = node.current_number * multiplier
-            points, bank = update_points_and_bank(new_number)
-            new_node = Node(new_number, node.ai_points, node.player_points + points, node.game_bank + bank, node.depth + 1, True, multiplier)
-            score, _, visited_nodes = alphabeta(new_node, depth-1, alpha, beta, True, visited_nodes)
-            if score < best_score:
-                best_score = score
-                best_move = multiplier
-            beta = min(beta, score)
-            if beta <= alpha:
-                break
-        return best_score, best_move, visited_nodes
-
-
-
-def play_game(algorithm):
-    current_number = random.randint(25, 40)
+#time_budget_ms switches alphabeta from fixed depth to iterative deepening within that budget,
+#ordering is a MoveOrdering kept for the whole game, seed fixes the start number and the random player's moves.
+#"pvs" is principal variation search with an aspiration window around the AI's previous score.
+#"mcts" searches playouts random playouts per move (or for time_budget_ms) and keeps its tree for the game.
+#rules (Rules) is the game to play; ordering must have been made for the same rules.
+#record (an empty GameRecord) gets the start number and every move.
+#Returns (winner, SearchStats of all AI turns); detailed_stats turns on the per-ply counters.
+def play_game(algorithm, tt=None, time_budget_ms=None, ordering=None, seed=None, depth=5, detailed_stats=False, playouts=PLAYOUTS, rules=RULES, record=None):
+    rng = random.Random(seed)
+    current_number = rules.random_start(rng)
+    if record is not None:
+        record.start_number = current_number
     ai_points = player_points = game_bank = 0
     is_player_turn = True
-    ai_turn_times = [] 
-    visited_nodes = 0
+    game_stats = SearchStats(detailed_stats)
+    tree = None
+    if algorithm == "mcts":
+        from engine.mcts import MCTS # numpy is only loaded by the games that need it
+        tree = MCTS(seed=seed, rules=rules)
+    core = stack_search if rules == RULES else StackSearch(evaluate, rules=rules)
+    previous_score = None # the AI's last score, the aspiration guess of "pvs"
 
-    while current_number < 5000:
+    while current_number < rules.target:
         if is_player_turn: 
-            multiplier = random.choice([2, 3, 4])
+            multiplier = rules.random_move(rng)
+            if record is not None:
+                record.add_move(multiplier, "random")
         else:  
             start_time = time.perf_counter() 
+            turn_stats = SearchStats(detailed_stats)
+            turn_stats.depth = depth
             initial_node = Node(current_number, ai_points, player_points, game_bank, 0, True)
-            if algorithm == "minimax":
-                _, multiplier, visited_nodes = minimax(initial_node, 5, True)
+            if ordering is not None:
+                ordering.new_search()
+            if algorithm == "minimax" and tt is None:
+                _, multiplier, _ = core.minimax(current_number, ai_points, player_points, game_bank, depth, turn_stats)
+            elif algorithm == "minimax":
+                _, multiplier, _ = minimax(initial_node, depth, True, turn_stats, tt, rules=rules)
+            elif algorithm == "alphabeta" and time_budget_ms:
+                _, multiplier, _, _ = iterative_deepening(alphabeta, initial_node, time_budget_ms, tt=tt, ordering=ordering, stats=turn_stats, rules=rules)
+            elif algorithm == "alphabeta" and tt is None and ordering is None:
+                _, multiplier, _ = core.alphabeta(current_number, ai_points, player_points, game_bank, depth, stats=turn_stats)
             elif algorithm == "alphabeta":
-                _, multiplier, visited_nodes = alphabeta(initial_node, 5, float('-inf'), float('inf'), True)
+                _, multiplier, _ = alphabeta(initial_node, depth, float('-inf'), float('inf'), True, turn_stats, tt, ordering=ordering, rules=rules)
+            elif algorithm == "pvs":
+                previous_score, pv, _ = pvs(initial_node, depth, previous_score, stats=turn_stats, tt=tt, ordering=ordering, rules=rules)
+                multiplier = pv[0]
+            elif algorithm == "solved":
+                multiplier = solved_move(get_table(rules=rules), current_number, game_bank, rules)
+                turn_stats.depth = 0
+            elif algorithm == "mcts":
+                turn_stats.depth = 0 # set to the deepest tree ply by the search
+                _, multiplier, _ = tree.search(current_number, ai_points, player_points, game_bank, None if time_budget_ms else playouts, time_budget_ms, turn_stats)
             
             end_time = time.perf_counter() 
-            ai_turn_time_ms = (end_time - start_time) * 1000  
-            ai_turn_times.append(ai_turn_time_ms)  
-            #print(f"Visited nodes: {visited_nodes}")
-        new_number = current_number * multiplier
-        points, bank = update_points_and_bank(new_number)
-        if is_player_turn:
-            player_points += points
-        else:
-            ai_points += points
-        game_bank += bank
+            turn_stats.time_ms = (end_time - start_time) * 1000  
+            game_stats.merge(turn_stats)
+            if record is not None:
+                record.add_move(multiplier, algorithm, turn_stats.depth, turn_stats.time_ms, turn_stats.nodes)
+            #print(f"Visited nodes: {turn_stats.nodes}")
+        current_number, ai_points, player_points, game_bank, ai_to_move = rules.apply(
+            (current_number, ai_points, player_points, game_bank, not is_player_turn), multiplier)
+        is_player_turn = not ai_to_move
 
-        current_number = new_number
-        is_player_turn = not is_player_turn
-
-    avg_turn_time_ms = sum(ai_turn_times) / len(ai_turn_times) if ai_turn_times else 0
-    #print(f"Average AI turn time: {avg_turn_time_ms:.5f} milliseconds") 
-    total_ai_turn_time_ms = sum(ai_turn_times)
+    #print(f"Average AI turn time: {game_stats.time_ms / max(1, game_stats.searches):.5f} milliseconds") 
     if ai_points > player_points:
-        return "AI", visited_nodes, total_ai_turn_time_ms
+        return "AI", game_stats
+    else:
+        return "Player", game_stats
+#Plays one seeded game with fresh per-game TT/ordering state and returns its counters as
+#(ai_win, game SearchStats, tt_hits, tt_cutoffs, cutoffs, first_move_cutoffs, encoded GameRecord or None).
+#With cache_path the TT is the process's PositionCache on that file instead, flushed after the game.
+#Top-level so pool workers can run it.
+def run_game(args):
+    algorithm, seed, tt_size, time_budget_ms, ordering, depth, detailed_stats, playouts, rules, cache_path, record_game = args
+    if cache_path:
+        tt = open_cache(cache_path, rules, get_weights())
     else:
-        return "Player", visited_nodes, total_ai_turn_time_ms
-def test_algorithm(algorithm, games=100):
-    total_visited_nodes = 0
-    total_time_ms = 0
+        tt = TranspositionTable(tt_size) if tt_size else None
+    hits, cutoffs = (tt.hits, tt.cutoffs) if tt is not None else (0, 0)
+    move_ordering = None
+    if ordering:
+        move_ordering = MoveOrdering(evaluate, update_points_and_bank, rules=rules) if ordering is True else MoveOrdering(evaluate, update_points_and_bank, ordering, rules=rules)
+    record = GameRecord() if record_game else None
+    result, game_stats = play_game(algorithm, tt, time_budget_ms, move_ordering, seed, depth, detailed_stats, playouts, rules, record)
+    if cache_path:
+        tt.flush()
+    return (result == "AI", game_stats,
+            tt.hits - hits if tt is not None else 0, tt.cutoffs - cutoffs if tt is not None else 0,
+            move_ordering.total_cutoffs if move_ordering is not None else 0,
+            move_ordering.total_first_move_cutoffs if move_ordering is not None else 0,
+            record.encode(rules) if record is not None else None)
+
+#tt_size enables a transposition table of that size, ordering the killer/history/static
+#move ordering (a tuple picks the heuristics); both are fresh for every game.
+#Game i is played with seed + i, so the results only depend on seed, not on workers
+#(workers > 1 spreads the games over a process pool, 0 uses every core).
+#detailed_stats adds per-ply nodes/cutoffs, leaf evaluations and the effective branching factor.
+#playouts is the per-move budget of "mcts" when there is no time_budget_ms.
+#cache_path replaces the TT with the persistent PositionCache in that file (CACHE_PATH), shared
+#by the workers and kept for the next run. record_path appends every game to that record file.
+def test_algorithm(algorithm, games=100, tt_size=None, time_budget_ms=None, ordering=None, seed=None, workers=1, depth=5, detailed_stats=False, playouts=PLAYOUTS, rules=RULES, cache_path=None, record_path=None):
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    jobs = [(algorithm, seed + i, tt_size, time_budget_ms, ordering, depth, detailed_stats, playouts, rules, cache_path, record_path is not None) for i in range(games)]
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(run_game, jobs, chunksize=max(1, games // (workers * 8)))
+    else:
+        results = map(run_game, jobs)
+
+    total_stats = SearchStats(detailed_stats)
     ai_wins = 0
-    for _ in range(games):
-        result, visited_nodes, ai_turn_time_ms = play_game(algorithm)
-        if result == "AI":
+    tt_hits = tt_cutoffs = 0
+    cutoffs = first_move_cutoffs = 0
+    writer = RecordWriter(record_path, rules) if record_path is not None else None
+    for ai_win, game_stats, game_tt_hits, game_tt_cutoffs, game_cutoffs, game_first_move_cutoffs, encoded_record in results:
+        if writer is not None:
+            writer.write_encoded(encoded_record)
+        if ai_win:
             ai_wins += 1
-        total_visited_nodes += visited_nodes
-        total_time_ms += ai_turn_time_ms
+        total_stats.merge(game_stats)
+        tt_hits += game_tt_hits
+        tt_cutoffs += game_tt_cutoffs
+        cutoffs += game_cutoffs
+        first_move_cutoffs += game_first_move_cutoffs
+    if writer is not None:
+        writer.close()
+
+    turns = max(1, total_stats.searches)
+    if cache_path:
+        label = f"{algorithm} + cache({os.path.basename(cache_path)})"
+    else:
+        label = f"{algorithm} + TT({tt_size})" if tt_size else algorithm
+    if algorithm == "mcts" and not time_budget_ms:
+        label += f" {playouts} playouts"
+    elif depth != 5 and algorithm != "mcts":
+        label += f" depth {depth}"
+    if ordering:
+        label += " + ordering" if ordering is True else f" + ordering{tuple(ordering)}"
+    if time_budget_ms:
+        label += f" @ {time_budget_ms} ms/move"
+    if workers > 1:
+        label += f" on {workers} workers"
+    if rules != RULES:
+        label += f" ({rules})"
+    print(f"{label}: AI wins {ai_wins}/{games} games (seed {seed}).")
+    print(f"Average visited nodes per game: {total_stats.nodes / games}, per AI turn: {total_stats.nodes / turns:.2f}")
+    print(f"Average AI time per game: {total_stats.time_ms / games:.4f} ms, per AI turn: {total_stats.time_ms / turns:.4f} ms")
+    if detailed_stats:
+        print(f"Search stats: {total_stats.summary()}")
+    if tt_size or cache_path:
+        print(f"TT hits per game: {tt_hits / games:.1f}, cutoffs per game: {tt_cutoffs / games:.1f}")
+    if ordering:
+        rate = first_move_cutoffs / cutoffs if cutoffs else 0.0
+        print(f"Cutoffs per game: {cutoffs / games:.1f}, caused by the first move: {rate:.1%}")
+
+#Share of solved positions where the engine picks a move as good as perfect play
+def oracle_agreement(algorithm, depth=5):
+    moves, values = solve()
+    agreed = 0
+    for (number, bank), best_move in moves.items():
+        node = Node(number, 0, 0, bank, 0, True)
+        if algorithm == "minimax":
+            _, multiplier, _ = minimax(node, depth, True)
+        elif algorithm == "alphabeta":
+            _, multiplier, _ = alphabeta(node, depth, float('-inf'), float('inf'), True)
+        elif algorithm == "pvs":
+            multiplier = pvs(node, depth)[1][0]
+        if move_value(number, bank, multiplier) == values[(number, bank)]:
+            agreed += 1
+    print(f"{algorithm} depth {depth}: perfect-play moves in {agreed}/{len(moves)} positions")
+
+#Checks batched_minimax() against minimax() on random positions and compares the
+#throughput of whole simulations against the serial test_algorithm("minimax").
+def compare_batched(games=1000, depth=5, positions=2000, seed=0):
+    from engine.batched_search import batched_minimax, play_games_batched
+    rng = random.Random(seed)
+    states = [(rng.randint(RULES.start_low, RULES.target - 1), rng.randint(-5, 5), rng.randint(-5, 5), rng.randint(0, 6)) for _ in range(positions)]
+    expected = [minimax(Node(*state, 0, True), depth, True)[1] for state in states]
+    _, moves, _ = batched_minimax(*zip(*states), depth=depth)
+    mismatches = sum(1 for move, expected_move in zip(moves, expected) if move != expected_move)
+    print(f"batched minimax depth {depth}: {mismatches} mismatches in {positions} positions")
+
+    start_time = time.perf_counter()
+    ai_wins, _ = play_games_batched(games, depth, seed)
+    batched_ms = (time.perf_counter() - start_time) * 1000
+    print(f"batched minimax: AI wins {ai_wins}/{games} games (seed {seed}) in {batched_ms:.1f} ms")
+    start_time = time.perf_counter()
+    test_algorithm("minimax", games, seed=seed, depth=depth)
+    serial_ms = (time.perf_counter() - start_time) * 1000
+    print(f"serial minimax took {serial_ms:.1f} ms, batched is {serial_ms / batched_ms:.1f}x faster")
+
+#Checks pvs() against plain minimax() on random positions: same score and move, with and without
+#an aspiration guess near the score, and the principal variation played out ends in a position
+#that evaluates to that score. Prints the nodes each search needed.
+def compare_pvs(depths=range(1, 8), positions=2000, seed=0, rules=RULES):
+    rng = random.Random(seed)
+    mismatches = 0
+    nodes = {"minimax": 0, "alphabeta": 0, "pvs": 0, "pvs + aspiration": 0}
+    for _ in range(positions):
+        depth = rng.choice(depths)
+        state = (rng.randint(rules.start_low, rules.target - 1), rng.randint(-5, 5), rng.randint(-5, 5), rng.randint(0, 6))
+        score, move, stats = minimax(Node(*state, 0, True), depth, True, rules=rules)
+        nodes["minimax"] += stats.nodes
+        nodes["alphabeta"] += alphabeta(Node(*state, 0, True), depth, float('-inf'), float('inf'), True, rules=rules)[2].nodes
+        guess = score + rng.uniform(-2, 2)
+        for name, guess in (("pvs", None), ("pvs + aspiration", guess)):
+            pv_score, pv, stats = pvs(Node(*state, 0, True), depth, guess, rules=rules)
+            nodes[name] += stats.nodes
+            number, ai_points, player_points, game_bank = state
+            for ply, multiplier in enumerate(pv):
+                number *= multiplier
+                points, bank = update_points_and_bank(number)
+                if ply % 2 == 0:
+                    ai_points += points
+                else:
+                    player_points += points
+                game_bank += bank
+            complete = len(pv) == depth or number >= rules.target
+            if pv_score != score or pv[0] != move or not complete or evaluate(number, ai_points, player_points, game_bank, True, rules) != score:
+                mismatches += 1
+    print(f"pvs: {mismatches} mismatches with minimax in {positions} positions, depths {min(depths)}-{max(depths)}")
+    print("nodes: " + ", ".join(f"{name} {count}" for name, count in nodes.items()))
 
-    average_visited_nodes = total_visited_nodes / games
-    average_turn_time_ms = total_time_ms / games
-    print(f"{algorithm}: AI wins {ai_wins}/{games} games.")
-    print(f"Average visited nodes per game: {average_visited_nodes}")
-    print(f"Average AI turn time: {average_turn_time_ms:.4f} ms")
+#Nodes/sec and peak traced memory of the recursive Node-based search against StackSearch.
+#Small start numbers give the deep trees (the target is far away).
+def compare_stack_core(depths=(8, 9, 10), start_numbers=range(1, 41)):
+    for depth in depths:
+        for name, search in (("recursive", lambda n: minimax(Node(n, 0, 0, 0, 0, True), depth, True)),
+                             ("stack", lambda n: stack_search.minimax(n, 0, 0, 0, depth))):
+            start_time = time.perf_counter()
+            nodes = sum(search(n)[2].nodes for n in start_numbers)
+            elapsed = time.perf_counter() - start_time
+            tracemalloc.start()
+            search(start_numbers[0])
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{name} minimax depth {depth}: {nodes / elapsed:,.0f} nodes/s, peak {peak / 1024:.1f} KiB")
 
-test_algorithm("minimax")
-test_algorithm("alphabeta")
+if __name__ == "__main__":
+    test_algorithm("minimax")
+    test_algorithm("alphabeta")
+    test_algorithm("minimax", tt_size=100000)
+    test_algorithm("alphabeta", tt_size=100000)
+    test_algorithm("alphabeta", ordering=("killer",))
+    test_algorithm("alphabeta", ordering=True)
+    test_algorithm("alphabeta", ordering=True, detailed_stats=True)
+    test_algorithm("alphabeta", tt_size=100000, time_budget_ms=5)
+    test_algorithm("alphabeta", tt_size=100000, time_budget_ms=5, ordering=True)
+    test_algorithm("solved")
+    test_algorithm("mcts", seed=0)
+    test_algorithm("mcts", time_budget_ms=1, seed=0)
+    test_algorithm("alphabeta", games=10000, seed=0)
+    test_algorithm("alphabeta", games=10000, seed=0, workers=0)
+    oracle_agreement("minimax")
+    oracle_agreement("alphabeta")
+    compare_batched()
+    compare_stack_core()
+    compare_pvs()
@@ -0,0 +1,228 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import zlib
+from multiprocessing import Pool
+
+from benchmark import make_engine, parse_depths
+from engine import PLAYOUTS, RULES, Rules, SearchStats, parse_target
+
+DEFAULT_ENGINES = ["random", "minimax:3", "minimax:5", "alphabeta:5", "mcts", "solved"]
+DEFAULT_DEPTH = 5
+
+
+#Engine spec "name" or "name:N" -> move(current_number, own_points, opponent_points, game_bank) -> (multiplier, SearchStats).
+#N is the depth of minimax/alphabeta (and the other benchmark engines) and the playouts of mcts.
+#Every search is run from the point of view of the side to move. Call once per game.
+def make_player(spec, seed, rules=RULES):
+    name, _, arg = spec.partition(":")
+    if name == "random":
+        rng = random.Random(seed)
+        return lambda n, own, opponent, bank: (rules.random_move(rng), SearchStats())
+    if name == "mcts":
+        from engine.mcts import MCTS
+        tree = MCTS(seed=seed, rules=rules)
+        playouts = int(arg) if arg else PLAYOUTS
+        return lambda n, own, opponent, bank: tree.search(n, own, opponent, bank, playouts)[1:]
+    engine = make_engine(name, rules)
+    depth = int(arg) if arg else DEFAULT_DEPTH
+    return lambda n, own, opponent, bank: engine(n, own, opponent, bank, depth)
+
+
+#Every pair plays from every start number with both sides moving first, rounds times.
+#The game id fixes the seed, so a game is the same whether it runs now or after a resume.
+#Games under other rules than the classic ones get the rules in their id.
+def schedule(engines, starts, rounds, seed, rules=RULES):
+    prefix = "" if rules == RULES else f"{rules.target}|{','.join(map(str, rules.multipliers))}|"
+    games = []
+    for i, first in enumerate(engines):
+        for second in engines[i + 1:]:
+            for start in starts:
+                for round_index in range(rounds):
+                    for pair in ((first, second), (second, first)):
+                        game_id = f"{prefix}{pair[0]}|{pair[1]}|{start}|{round_index}"
+                        games.append((game_id, pair[0], pair[1], start, (seed + zlib.crc32(game_id.encode())) % 2 ** 32, rules))
+    return games
+
+
+#Plays one game, same rules as play_game(): whoever reaches the target takes the bank, equal points is a draw.
+#Returns the JSON record written to the results file; index 0 is the side that moves first.
+def play_match(job):
+    game_id, first, second, start, seed, rules = job
+    players = [make_player(first, seed, rules), make_player(second, seed + 1, rules)]
+    points = [0, 0]
+    time_ms = [0.0, 0.0]
+    max_ms = [0.0, 0.0]
+    nodes = [0, 0]
+    moves = [0, 0]
+    current_number = start
+    game_bank = 0
+    side = 0
+    while current_number < rules.target:
+        start_time = time.perf_counter()
+        multiplier, stats = players[side](current_number, points[side], points[1 - side], game_bank)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        time_ms[side] += elapsed_ms
+        max_ms[side] = max(max_ms[side], elapsed_ms)
+        nodes[side] += stats.nodes
+        moves[side] += 1
+        current_number, points[0], points[1], game_bank, _ = rules.apply((current_number, points[0], points[1], game_bank, side == 0), multiplier)
+        side = 1 - side
+    if points[0] == points[1]:
+        score = 0.5
+    else:
+        score = 1.0 if points[0] > points[1] else 0.0
+    return {"id": game_id, "engines": [first, second], "start": start, "target": rules.target, "seed": seed, "score": score,
+            "points": points, "moves": moves, "nodes": nodes, "time_ms": time_ms, "max_ms": max_ms}
+
+
+#Records already in the results file. A line cut off by an interrupted run is skipped (and replayed).
+def load_results(path):
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                continue
+    return results
+
+
+#Plays the games that are not in the results file yet and appends each one as soon as it finishes.
+def run_tournament(engines, starts=None, rounds=1, seed=0, workers=0, output="tournament_results.jsonl", rules=RULES):
+    if starts is None:
+        starts = rules.start_numbers
+    results = load_results(output)
+    done = {result["id"] for result in results}
+    jobs = [job for job in schedule(engines, starts, rounds, seed, rules) if job[0] not in done]
+    print(f"{len(done)} games already in {output}, {len(jobs)} to play")
+    if not jobs:
+        return results
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if os.path.exists(output) and os.path.getsize(output) > 0:
+        with open(output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    else:
+        needs_newline = False
+    with open(output, "a") as f:
+        if needs_newline: # the last line was cut off, start on a fresh one
+            f.write("\n")
+        if workers > 1:
+            pool = Pool(workers)
+            played = pool.imap_unordered(play_match, jobs, chunksize=max(1, len(jobs) // (workers * 32)))
+        else:
+            pool = None
+            played = map(play_match, jobs)
+        try:
+            for count, result in enumerate(played, start=1):
+                f.write(json.dumps(result) + "\n")
+                f.flush()
+                results.append(result)
+                if count % 500 == 0:
+                    print(f"{count}/{len(jobs)} games played")
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+    return results
+
+
+#Bradley-Terry ratings on the Elo scale by minorization-maximization, draws count as half a win.
+#Every engine gets one virtual draw against every opponent it met, so an engine that won (or lost)
+#every game still gets a finite rating. Anchored at random = 0 if it played, else at a mean of 0.
+def elo_ratings(results, iterations=200):
+    wins = {}
+    games = {}
+    for result in results:
+        first, second = result["engines"]
+        for engine in (first, second):
+            wins.setdefault(engine, 0.0)
+        pair = tuple(sorted((first, second)))
+        games[pair] = games.get(pair, 0) + 1
+        wins[first] += result["score"]
+        wins[second] += 1 - result["score"]
+    for first, second in games:
+        games[(first, second)] += 1
+        wins[first] += 0.5
+        wins[second] += 0.5
+    strength = {engine: 1.0 for engine in wins}
+    for _ in range(iterations):
+        new_strength = {}
+        for engine in strength:
+            total = 0.0
+            for (first, second), count in games.items():
+                if engine in (first, second):
+                    total += count / (strength[first] + strength[second])
+            new_strength[engine] = wins[engine] / total
+        scale = math.exp(sum(math.log(value) for value in new_strength.values()) / len(new_strength))
+        strength = {engine: value / scale for engine, value in new_strength.items()}
+    ratings = {engine: 400 * math.log10(value) for engine, value in strength.items()}
+    anchor = ratings.get("random", 0.0)
+    return {engine: rating - anchor for engine, rating in ratings.items()}
+
+
+def summarize(results):
+    engines = {}
+    pairs = {}
+    for result in results:
+        for side, engine in enumerate(result["engines"]):
+            row = engines.setdefault(engine, {"games": 0, "score": 0.0, "moves": 0, "nodes": 0, "time_ms": 0.0, "max_ms": 0.0})
+            row["games"] += 1
+            row["score"] += result["score"] if side == 0 else 1 - result["score"]
+            row["moves"] += result["moves"][side]
+            row["nodes"] += result["nodes"][side]
+            row["time_ms"] += result["time_ms"][side]
+            row["max_ms"] = max(row["max_ms"], result["max_ms"][side])
+        first, second = result["engines"]
+        key = tuple(sorted((first, second)))
+        pair = pairs.setdefault(key, [0, 0.0])
+        pair[0] += 1
+        pair[1] += result["score"] if first == key[0] else 1 - result["score"]
+
+    ratings = elo_ratings(results)
+    print(f"{'engine':16} {'elo':>7} {'games':>6} {'score':>7} {'ms/move':>9} {'max ms':>8} {'nodes/move':>11}")
+    for engine in sorted(engines, key=lambda engine: -ratings[engine]):
+        row = engines[engine]
+        moves = max(1, row["moves"])
+        print(f"{engine:16} {ratings[engine]:7.0f} {row['games']:6} {row['score'] / row['games']:7.1%} "
+              f"{row['time_ms'] / moves:9.4f} {row['max_ms']:8.3f} {row['nodes'] / moves:11.1f}")
+    print()
+    for (first, second), (count, score) in sorted(pairs.items()):
+        print(f"{first} vs {second}: {score / count:.1%} over {count} games")
+    return ratings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round-robin tournament between the engines")
+    parser.add_argument("--engines", default=",".join(DEFAULT_ENGINES), help="comma separated engine specs, name or name:depth (mcts:playouts)")
+    parser.add_argument("--starts", default=f"{RULES.start_low}-{RULES.start_high}", help="start numbers, range (25-40) or list (25,30)")
+    parser.add_argument("--target", default=str(RULES.target), help="number to reach (5000, 1e9)")
+    parser.add_argument("--multipliers", default=",".join(map(str, RULES.multipliers)), help="comma separated multipliers")
+    parser.add_argument("--rounds", type=int, default=1, help="games per pair, start number and side")
+    parser.add_argument("--seed", type=int, default=0, help="base seed of the random and mcts players")
+    parser.add_argument("--workers", type=int, default=0, help="processes to play on, 0 uses every core")
+    parser.add_argument("--output", default="tournament_results.jsonl", help="results file, appended to and resumed from")
+    parser.add_argument("--summary", action="store_true", help="only summarize the results file")
+    args = parser.parse_args(argv)
+
+    if args.summary:
+        results = load_results(args.output)
+    else:
+        starts = parse_depths(args.starts)
+        rules = Rules(parse_target(args.target), [int(multiplier) for multiplier in args.multipliers.split(",")], min(starts), max(starts))
+        results = run_tournament(args.engines.split(","), starts, args.rounds, args.seed, args.workers, args.output, rules)
+    if results:
+        summarize(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
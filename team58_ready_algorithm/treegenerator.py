@@ -1,24 +1,210 @@
-from graphviz import Digraph
+import graphviz
 
-def minimax_visualize(current_number, depth, graph, parent_name="Root", action=None):
+from engine import RULES, MoveOrdering, Node, SearchStats, TranspositionTable, evaluate, negamax, update_points_and_bank
+
+MAX_NODES = 20000 # default cap on drawn nodes, dot lays this out in seconds
+
+
+#Writes DOT source straight to a file with the node()/edge() calls of graphviz.Digraph,
+#so nothing but the open file is kept in memory.
+class DotWriter:
+    def __init__(self, filename, comment=None):
+        self.file = open(filename, "w")
+        self.nodes = 0
+        self.edges = 0
+        if comment:
+            self.file.write(f"// {comment}\n")
+        self.file.write("digraph {\n")
+
+    def node(self, name, label=None, **attrs):
+        if label is not None:
+            attrs["label"] = label
+        self.file.write(f"\t{quote(name)}{format_attrs(attrs)}\n")
+        self.nodes += 1
+
+    def edge(self, tail_name, head_name, **attrs):
+        self.file.write(f"\t{quote(tail_name)} -> {quote(head_name)}{format_attrs(attrs)}\n")
+        self.edges += 1
+
+    def close(self):
+        self.file.write("}\n")
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def quote(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def format_attrs(attrs):
+    if not attrs:
+        return ""
+    return " [" + " ".join(f"{key}={quote(value)}" for key, value in attrs.items()) + "]"
+
+
+def minimax_visualize(current_number, depth, graph, parent_name="Root", action=None, rules=RULES):
     node_name = f"{parent_name}_{action}_{current_number}" if action else f"Start_{current_number}"
     node_label = f"{action}*{current_number}" if action else f"Start: {current_number}"
-    
+
     graph.node(node_name, label=node_label)
 
     if action:
         graph.edge(parent_name, node_name)
-        
-    if depth == 0 or current_number >= 5000:
+
+    if depth == 0 or current_number >= rules.target:
         return
 
-    for next_multiplier in [2, 3, 4]:
+    for next_multiplier in rules.multipliers:
         next_number = current_number * next_multiplier
-        minimax_visualize(next_number, depth-1, graph, node_name, f"*{next_multiplier}")
+        minimax_visualize(next_number, depth-1, graph, node_name, f"*{next_multiplier}", rules)
+
+
+#minimax_visualize() without recursion and with short node names, stops after max_nodes nodes.
+#Returns True if the tree was cut off by the cap.
+def tree_visualize(current_number, depth, graph, max_nodes=MAX_NODES, rules=RULES):
+    stack = [(current_number, depth, None, None)] # (number, depth left, parent name, action)
+    while stack:
+        number, depth_left, parent_name, action = stack.pop()
+        if max_nodes is not None and graph.nodes >= max_nodes:
+            return True
+        node_name = f"n{graph.nodes}"
+        graph.node(node_name, label=f"{action}*{number}" if action else f"Start: {number}")
+        if action:
+            graph.edge(parent_name, node_name)
+        if depth_left == 0 or number >= rules.target:
+            continue
+        for next_multiplier in reversed(rules.multipliers): # popped in rules order
+            stack.append((number * next_multiplier, depth_left - 1, node_name, f"*{next_multiplier}"))
+    return False
+
+
+#Transposition-merged tree: positions with the same TT key (number, point difference, bank and
+#side to move) are drawn once, whichever moves and plies led to them, like the TT of the searches
+#stores them once. Built ply by ply; only the drawn positions are kept.
+#Returns True if the graph was cut off by max_nodes.
+def dag_visualize(current_number, depth, graph, max_nodes=MAX_NODES, rules=RULES):
+    root = Node(current_number, 0, 0, 0, 0, True)
+    names = {TranspositionTable.make_key(root, True): "n0"} # TT key -> drawn node
+    graph.node("n0", label=f"Start: {current_number}")
+    level = [(root, "n0")]
+    for ply in range(1, depth + 1):
+        is_maximizing = ply % 2 == 0 # the side to move at this ply
+        next_level = []
+        for node, node_name in level:
+            if node.current_number >= rules.target:
+                continue
+            for next_multiplier in rules.multipliers:
+                next_number = node.current_number * next_multiplier
+                points, bank = update_points_and_bank(next_number)
+                if is_maximizing: # the player moved into this ply
+                    child = Node(next_number, node.ai_points, node.player_points + points, node.game_bank + bank, ply, True)
+                else:
+                    child = Node(next_number, node.ai_points + points, node.player_points, node.game_bank + bank, ply, False)
+                key = TranspositionTable.make_key(child, is_maximizing)
+                child_name = names.get(key)
+                if child_name is None:
+                    if max_nodes is not None and graph.nodes >= max_nodes:
+                        return True
+                    child_name = f"n{graph.nodes}"
+                    names[key] = child_name
+                    next_level.append((child, child_name))
+                    graph.node(child_name, label=f"{next_number}\ndiff {key[1]} bank {key[2]}",
+                               shape="box" if next_number >= rules.target else "ellipse")
+                graph.edge(node_name, child_name, label=f"*{next_multiplier}")
+        if not next_level:
+            break
+        level = next_level
+    return False
+
+
+#negamax() trace that draws the searched tree, writing every node after its subtree, when its
+#score is known. Nodes past max_nodes are still searched but not drawn, so the scores stay exact.
+class SearchTrace:
+    def __init__(self, graph, max_nodes=MAX_NODES):
+        self.graph = graph
+        self.max_nodes = max_nodes
+        self.visited = 0
+        self.reserved = 0 # nodes that are or will be drawn
+        self.truncated = False
+        self.stack = [] # (name, drawn) of the nodes being searched, the root first
+
+    def reserve(self):
+        if self.max_nodes is not None and self.reserved >= self.max_nodes:
+            self.truncated = True
+            return False
+        self.reserved += 1
+        return True
+
+    def visit(self, node):
+        parent_drawn = self.stack[-1][1] if self.stack else True
+        self.stack.append((f"n{self.visited}", parent_drawn and self.reserve()))
+        self.visited += 1
+
+    def cutoff(self, node, skipped):
+        node_name, drawn = self.stack[-1]
+        for pruned in skipped:
+            if drawn and self.reserve():
+                pruned_name = f"{node_name}_x{pruned}"
+                self.graph.node(pruned_name, label=f"*{pruned}*{node.current_number * pruned}\npruned", style="dashed", color="grey", fontcolor="grey")
+                self.graph.edge(node_name, pruned_name, style="dashed", color="grey")
+
+    def leave(self, node, score, how):
+        node_name, drawn = self.stack.pop()
+        if not drawn:
+            return
+        label = f"*{node.multiplier}*{node.current_number}" if self.stack else f"Start: {node.current_number}"
+        if how == "searched":
+            self.graph.node(node_name, label=f"{label}\n{'MAX' if node.is_maximizing else 'MIN'} {score:g}", shape="ellipse")
+        elif how == "tt":
+            self.graph.node(node_name, label=f"{label}\nTT {score:g}", shape="box", color="blue", fontcolor="blue")
+        else:
+            self.graph.node(node_name, label=f"{label}\n{score:g}", shape="box")
+        if self.stack:
+            self.graph.edge(self.stack[-1][0], node_name)
+
+
+#Draws the tree alphabeta() explores from an AI-to-move position by tracing the engine's own
+#negamax(), with the score of every searched node. Moves skipped by a cutoff are drawn dashed
+#and grey, TT hits blue; with ordering the children are drawn in the order they were searched.
+#Returns (score, move, visited nodes, True if the drawing was cut off).
+def alphabeta_visualize(current_number, depth, graph, max_nodes=MAX_NODES, ai_points=0, player_points=0, game_bank=0, tt=None, ordering=None, rules=RULES):
+    trace = SearchTrace(graph, max_nodes)
+    if ordering is not None:
+        ordering.new_search()
+    root = Node(current_number, ai_points, player_points, game_bank, 0, True)
+    score, move = negamax(root, depth, float('-inf'), float('inf'), 1, SearchStats(), tt, ordering=ordering, rules=rules, trace=trace)
+    return score, move if score > float('-inf') else None, trace.visited, trace.truncated
+
 
-def create_decision_tree(start_number=25, depth=3):
-    graph = Digraph(comment='Decision Tree for Game')
-    minimax_visualize(start_number, depth, graph)
-    graph.render('decision_tree', view=True, format='pdf')
+#mode: "tree" (every path), "dag" (transpositions merged), "alphabeta" (the searched tree with pruned
+#moves) or "alphabeta_tt" (the same with the TT and move ordering the GUI's alpha-beta AI uses).
+#The DOT source is streamed to filename, then rendered to filename.format unless render=False.
+def create_decision_tree(start_number=25, depth=3, mode="tree", max_nodes=MAX_NODES, filename='decision_tree', view=True, format='pdf', render=True, rules=RULES):
+    with DotWriter(filename, comment=f'Decision Tree for Game ({mode})') as graph:
+        if mode == "tree":
+            truncated = tree_visualize(start_number, depth, graph, max_nodes, rules)
+        elif mode == "dag":
+            truncated = dag_visualize(start_number, depth, graph, max_nodes, rules)
+        elif mode == "alphabeta":
+            truncated = alphabeta_visualize(start_number, depth, graph, max_nodes, rules=rules)[3]
+        elif mode == "alphabeta_tt":
+            truncated = alphabeta_visualize(start_number, depth, graph, max_nodes, tt=TranspositionTable(),
+                                            ordering=MoveOrdering(evaluate, update_points_and_bank, rules=rules), rules=rules)[3]
+        else:
+            raise ValueError(f"unknown mode: {mode}")
+    if truncated:
+        print(f"Decision tree cut off at {max_nodes} nodes")
+    if not render:
+        return filename
+    output = graphviz.render('dot', format, filename)
+    if view:
+        graphviz.view(output)
+    return output
 
-create_decision_tree(25, 10)
+if __name__ == "__main__":
+    create_decision_tree(25, 10)
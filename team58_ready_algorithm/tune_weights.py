@@ -0,0 +1,237 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from benchmark import parse_depths
+from engine import RULES, WEIGHTS_FILE, Rules, load_weights, parse_target, save_weights
+from engine.batched_search import play_weights_batched
+from tournament import load_results
+
+STAGES = (64, 256, 1024) # pairs of games played before each early-stopping check, the last is the full evaluation
+PRUNE_Z = 2.0 # a candidate stops when its score plus PRUNE_Z standard errors is below the best full score
+TUNING_DEPTH = 2 # at depth 5 nearly every leaf is a finished game and the weights hardly change a move
+B_RANGE = (-1.0, 3.0)
+C_RANGE = (-0.002, 0.002)
+CANDIDATE_FILE = os.path.join(os.path.dirname(WEIGHTS_FILE), "weights_candidate.json") # copy it to weights.json to use it
+
+
+#A is fixed at 1: scaling all weights by a positive factor never changes a move, so only B/A and C/A matter.
+#Rounded so candidates that only differ in noise share their cached games.
+def make_weights(B, C):
+    return 1, round(float(B), 4), float(f"{C:.4g}")
+
+
+#Cache key of one block of pairs; everything that changes the games is in it
+def job_key(job):
+    weights, opponent, depth, seed, opening_plies, first, last, rules = job
+    opponent_key = "random" if opponent is None else ",".join(map(repr, opponent))
+    return (f"{','.join(map(repr, weights))}|{opponent_key}|d{depth}|o{opening_plies}|s{seed}|{first}-{last}"
+            f"|{rules.target}|{','.join(map(str, rules.multipliers))}|{rules.start_low}-{rules.start_high}")
+
+
+#Plays pairs first..last-1 of one candidate. Top-level so pool workers can run it.
+def run_job(job):
+    weights, opponent, depth, seed, opening_plies, first, last, rules = job
+    scores = play_weights_batched(last - first, weights, opponent, depth, seed + first, opening_plies, rules)
+    return {"key": job_key(job), "pairs": len(scores), "sum": float(scores.sum()), "sum_sq": float((scores ** 2).sum())}
+
+
+#Scores candidates by self-play and keeps every block of games in the cache file (appended, like
+#the tournament results, so an interrupted run resumes where it stopped).
+class Tuner:
+    def __init__(self, opponent, depth=TUNING_DEPTH, seed=0, opening_plies=2, stages=STAGES, prune_z=PRUNE_Z,
+                 workers=0, cache_path="tuning_cache.jsonl", rules=RULES):
+        self.opponent = opponent
+        self.depth = depth
+        self.seed = seed
+        self.opening_plies = opening_plies
+        self.stages = stages
+        self.prune_z = prune_z
+        self.rules = rules
+        self.cache_path = cache_path
+        self.cache = {record["key"]: record for record in load_results(cache_path)}
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = Pool(self.workers) if self.workers > 1 else None
+        self.results = {} # weights -> (score, standard error, pairs, stopped early)
+        self.best = None # weights with the best full evaluation
+        self.pairs_played = 0
+        self.cache_hits = 0
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+
+    def play(self, jobs):
+        missing = [job for job in jobs if job_key(job) not in self.cache]
+        self.cache_hits += len(jobs) - len(missing)
+        if not missing:
+            return
+        played = self.pool.imap_unordered(run_job, missing) if self.pool is not None else map(run_job, missing)
+        with open(self.cache_path, "a") as f:
+            for record in played:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                self.cache[record["key"]] = record
+                self.pairs_played += record["pairs"]
+
+    #Races the candidates through the stages: after each one, those that are clearly worse
+    #than the best fully evaluated weights stop. Every candidate of a stage plays at once.
+    def evaluate(self, candidates):
+        candidates = [weights for weights in dict.fromkeys(candidates) if weights not in self.results]
+        totals = {weights: [0, 0.0, 0.0] for weights in candidates}
+        alive = candidates
+        first = 0
+        for stage_index, last in enumerate(self.stages):
+            jobs = [(weights, self.opponent, self.depth, self.seed, self.opening_plies, first, last, self.rules) for weights in alive]
+            self.play(jobs)
+            for job in jobs:
+                record = self.cache[job_key(job)]
+                total = totals[job[0]]
+                total[0] += record["pairs"]
+                total[1] += record["sum"]
+                total[2] += record["sum_sq"]
+            first = last
+            final = stage_index == len(self.stages) - 1
+            survivors = []
+            for weights in alive:
+                score, error = mean_and_error(*totals[weights])
+                if final or self.best is None or score + self.prune_z * error >= self.results[self.best][0]:
+                    survivors.append(weights)
+                else:
+                    self.results[weights] = (score, error, totals[weights][0], True)
+            alive = survivors
+        for weights in alive:
+            score, error = mean_and_error(*totals[weights])
+            self.results[weights] = (score, error, totals[weights][0], False)
+            if self.best is None or score > self.results[self.best][0]:
+                self.best = weights
+        return [self.results[weights] for weights in candidates]
+
+    #Candidates that finished ahead of those stopped early, then by score
+    def ranking(self):
+        return sorted(self.results, key=lambda weights: (not self.results[weights][3], self.results[weights][0]), reverse=True)
+
+
+def mean_and_error(pairs, total, total_sq):
+    mean = total / pairs
+    variance = max(0.0, total_sq / pairs - mean * mean)
+    return mean, math.sqrt(variance / pairs)
+
+
+def grid_candidates(points):
+    return [make_weights(B, C) for B in np.linspace(*B_RANGE, points) for C in np.linspace(*C_RANGE, points)]
+
+
+def random_candidates(count, rng):
+    return [make_weights(rng.uniform(*B_RANGE), rng.uniform(*C_RANGE)) for _ in range(count)]
+
+
+#CMA-style search with a diagonal covariance: each generation samples population candidates
+#around the mean, then moves the mean to a rank-weighted average of the best quarter and
+#sets the step sizes from how far those were spread (never below a floor, so it keeps looking).
+def evolution_strategy(tuner, start, generations, population, rng):
+    bounds = np.array([B_RANGE, C_RANGE])
+    low, high = bounds[:, 0], bounds[:, 1]
+    mean = np.clip(np.array(start[1:], dtype=float), low, high)
+    sigma = (high - low) / 4
+    floor = (high - low) / 100
+    elite = max(2, population // 4)
+    recombination = np.log(elite + 0.5) - np.log(np.arange(1, elite + 1))
+    recombination /= recombination.sum()
+    for generation in range(generations):
+        samples = np.clip(mean + sigma * rng.standard_normal((population, 2)), low, high)
+        candidates = [make_weights(B, C) for B, C in samples]
+        tuner.evaluate(candidates)
+        scored = [tuner.results[weights] for weights in candidates] # repeats were scored in earlier generations
+        order = sorted(range(population), key=lambda i: (not scored[i][3], scored[i][0]), reverse=True)[:elite]
+        best = samples[order]
+        new_mean = recombination @ best
+        sigma = np.maximum(floor, np.sqrt(recombination @ (best - mean) ** 2))
+        mean = new_mean
+        score = tuner.results[tuner.best][0]
+        print(f"generation {generation + 1}: best {format_weights(tuner.best)} score {score:.4f}, mean B={mean[0]:.3f} C={mean[1]:.3g}")
+
+
+def format_weights(weights):
+    return f"A={weights[0]:g} B={weights[1]:g} C={weights[2]:g}"
+
+
+def parse_weights(text):
+    return tuple(float(weight) for weight in text.split(","))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the A, B, C weights of evaluate() by batched self-play")
+    parser.add_argument("--strategy", choices=("grid", "random", "es"), default="es", help="grid, random or a CMA-style evolution strategy")
+    parser.add_argument("--grid", type=int, default=5, help="grid points per weight")
+    parser.add_argument("--candidates", type=int, default=16, help="random candidates, or the population of each es generation")
+    parser.add_argument("--generations", type=int, default=6, help="es generations")
+    parser.add_argument("--opponent", default="current", help="current (the weights the engines load), random, or A,B,C")
+    parser.add_argument("--depth", type=int, default=TUNING_DEPTH, help="minimax depth of both sides")
+    parser.add_argument("--opening-plies", type=int, default=2, help="random moves that open every pair of games")
+    parser.add_argument("--stages", default=",".join(map(str, STAGES)), help="pairs played before each early-stopping check")
+    parser.add_argument("--prune-z", type=float, default=PRUNE_Z, help="standard errors below the best score that stop a candidate")
+    parser.add_argument("--target", default=str(RULES.target), help="number to reach (5000, 1e9)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the openings and the search")
+    parser.add_argument("--workers", type=int, default=0, help="processes to play on, 0 uses every core")
+    parser.add_argument("--cache", default="tuning_cache.jsonl", help="results of every played block, appended to and reused")
+    parser.add_argument("--output", default=CANDIDATE_FILE, help=f"where the tuned weights are written; the engines load {os.path.basename(WEIGHTS_FILE)}")
+    args = parser.parse_args(argv)
+
+    rules = Rules(parse_target(args.target), RULES.multipliers, RULES.start_low, RULES.start_high)
+    current = load_weights()
+    if args.opponent == "current":
+        opponent = current
+    elif args.opponent == "random":
+        opponent = None
+    else:
+        opponent = parse_weights(args.opponent)
+    stages = tuple(parse_depths(args.stages))
+    rng = np.random.default_rng(args.seed)
+    tuner = Tuner(opponent, args.depth, args.seed, args.opening_plies, stages, args.prune_z, args.workers, args.cache, rules)
+    start_time = time.perf_counter()
+    try:
+        reference = tuple(current)
+        tuner.evaluate([reference]) # the bar every candidate has to clear
+        if args.strategy == "grid":
+            tuner.evaluate(grid_candidates(args.grid))
+        elif args.strategy == "random":
+            tuner.evaluate(random_candidates(args.candidates, rng))
+        else:
+            evolution_strategy(tuner, reference, args.generations, args.candidates, rng)
+    finally:
+        tuner.close()
+    elapsed = time.perf_counter() - start_time
+
+    stopped = sum(1 for result in tuner.results.values() if result[3])
+    print(f"{len(tuner.results)} candidates, {stopped} stopped early, {tuner.pairs_played} pairs played, "
+          f"{tuner.cache_hits} blocks from {args.cache}, {elapsed:.1f} s on {tuner.workers} workers")
+    print(f"{'weights':34} {'score':>7} {'+-':>7} {'pairs':>6}")
+    for weights in tuner.ranking()[:10]:
+        score, error, pairs, early = tuner.results[weights]
+        print(f"{format_weights(weights):34} {score:7.4f} {error:7.4f} {pairs:6}{' stopped' if early else ''}")
+
+    best = tuner.best
+    score, error, pairs, _ = tuner.results[best]
+    reference_score = tuner.results[reference][0]
+    if best == reference or score - args.prune_z * error <= reference_score: # the win may be noise
+        print(f"No candidate beat the current weights {format_weights(reference)} ({reference_score:.4f}) by {args.prune_z:g} "
+              f"standard errors, {args.output} not written")
+        return 0
+    save_weights(best, args.output, {"score": score, "stderr": error, "pairs": pairs, "depth": args.depth,
+                                     "opponent": args.opponent, "strategy": args.strategy, "target": rules.target})
+    print(f"Best {format_weights(best)} ({score:.4f} +- {error:.4f}) written to {args.output}")
+    if os.path.abspath(args.output) != os.path.abspath(WEIGHTS_FILE):
+        print(f"Copy it to {WEIGHTS_FILE} to make the engines use it")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())